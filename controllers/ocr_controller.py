@@ -1,85 +1,277 @@
 from fastapi import HTTPException
 import time
 import asyncio
-from models.ocr_model import AadharExtraction, PANExtraction, PassportExtraction
-from services.ocr_service import extract_aadhar_details, extract_pan_card_details, extract_passport_details
-from utils.parsers import parse_aadhar_details, parse_pan_details, parse_passport_details
+import re
+from models.ocr_model import (AadharExtraction, PANExtraction, PassportExtraction, REQUIRED_FIELDS, AUTO_DOC_TYPE,
+                              EXTRACTION_MODELS, field_meta)
+from services.extractors import llm_extractor, local_ocr_reader
+from services.local_ocr import local_ocr_enabled, LOCAL_FIELD_PATTERNS, extract_regex_fields
+from services.cache_service import (result_cache, url_cache_key, content_cache_key, digest_cache_key,
+                                   CACHE_HASH_CONTENT)
+from services.image_service import (fetch_image_bytes, compact_image_url, to_data_url, PREPROCESS_IMAGES,
+                                    UnsafeURLError)
+from services.pdf_service import iter_pdf_pages, PDF_PAGE_CONCURRENCY
+from services.retry_policy import RetryPolicy, attempt_stats
+from services.rate_limiter import ProviderBusy
+from services.hedging import hedged_call, hedge_delay_for, HEDGE_ENABLED
+from utils.field_merge import FieldVotes
+from utils.singleflight import SingleFlight
+from utils.parsers import DOCUMENT_PARSERS, detect_document_type
 import logging
+import os
 
 # Configure logging
 logger = logging.getLogger(__name__)
-REQUIRED_FIELDS = {
-    'aadhar': ['Name', 'Date_Of_Birth', 'Gender', 'Aadhar_No', 'Address'],
-    'pan': ['panCardNumber', 'name', 'fatherName', 'dateOfBirth'],
-    'passport': ['Passport_No', 'Surname', 'Given_Name', 'Nationality', 'Sex',
-                 'Date_of_Birth', 'Place_of_Birth', 'Date_of_Issue',
-                 'Date_of_Expiry', 'Place_of_Issue']
+BATCH_CONCURRENCY = int(os.getenv("OCR_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("OCR_BATCH_MAX_CONCURRENCY", "32"))
+
+# Identical documents requested while one is already being extracted share that extraction
+document_flights = SingleFlight()
+
+
+async def process_document_controller(image_url: str, doc_type: str, max_retries=3,
+                                      retry_policy: RetryPolicy = None, hedge: bool = None):
+    """Main processing function: serves repeated documents from the result cache, else extracts with retries"""
+    if doc_type not in REQUIRED_FIELDS and doc_type != AUTO_DOC_TYPE:
+        raise HTTPException(status_code=400, detail="Unsupported document type")
+
+    url_key = url_cache_key(doc_type, image_url)
+    cached = await result_cache.get(url_key)
+    if cached:
+        logger.info(f"Cache hit for {doc_type} document")
+        return cached
+
+    # The first request's retry settings apply to everyone who joins it
+    return await document_flights.do(url_key, lambda: _process_document(image_url, doc_type, url_key, max_retries,
+                                                                         retry_policy, hedge))
+
+
+async def _process_document(image_url: str, doc_type: str, url_key: str, max_retries: int,
+                            retry_policy: RetryPolicy, hedge: bool):
+    image_bytes = await _fetch_for_pipeline(image_url, CACHE_HASH_CONTENT)
+
+    content_key = None
+    if CACHE_HASH_CONTENT and image_bytes is not None:
+        content_key = content_cache_key(doc_type, image_bytes)
+        cached = await result_cache.get(content_key)
+        if cached:
+            logger.info(f"Content cache hit for {doc_type} document")
+            result_cache.set(url_key, cached)
+            return cached
+
+    model_image_url = image_url
+    if PREPROCESS_IMAGES and image_bytes is not None:
+        model_image_url = await compact_image_url(image_url, image_bytes)
+
+    detected_type, prefilled = await _resolve_doc_type(model_image_url, doc_type, image_bytes)
+    result = await _extract_with_retries(model_image_url, detected_type, max_retries, retry_policy, hedge, prefilled)
+
+    # Only complete extractions reach here; partial results raise and are never cached
+    result_cache.set(url_key, result)
+    if content_key:
+        result_cache.set(content_key, result)
+    return result
+
+
+async def _fetch_for_pipeline(image_url: str, for_cache: bool = False):
+    """Fetch the image once if the content-hash cache, preprocessing or local OCR needs it, else None"""
+    if not (for_cache or PREPROCESS_IMAGES or local_ocr_enabled()):
+        return None
+    try:
+        return await fetch_image_bytes(image_url)
+    except Exception as e:
+        logger.warning(f"Could not fetch image: {str(e)}")
+        return None
+
+
+def _merged_result(doc_type: str, votes: FieldVotes):
+    parsed = votes.merged()
+    # Surname and Given_Name may come from different attempts, so Full_Name is rebuilt from the merge
+    if doc_type == 'passport' and parsed.get('Surname') and parsed.get('Given_Name'):
+        parsed['Full_Name'] = f"{parsed['Surname']} {parsed['Given_Name']}".strip()
+    return {
+        "document_type": doc_type,
+        "parsed_data": parsed,
+        "field_confidence": votes.confidence(),
+    }
+
+
+async def _local_lines(image_url: str, image_bytes=None):
+    """Text read by the local OCR fast path, or None when it is disabled or fails"""
+    if not local_ocr_enabled():
+        return None
+    try:
+        if image_bytes is None:
+            image_bytes = await fetch_image_bytes(image_url)
+        return await local_ocr_reader.read_lines(image_bytes)
+    except Exception as e:
+        logger.warning(f"Local OCR failed: {str(e)}")
+        return None
+
+
+async def _classify_with_model(image_url: str):
+    """Document type from a one-word model answer, or None"""
+    try:
+        detected = await llm_extractor.classify(image_url)
+    except Exception as e:
+        logger.error(f"Document classification failed: {str(e) or type(e).__name__}")
+        return None
+    logger.info(f"Model classified the document as {detected or 'unknown'}")
+    return detected
+
+
+async def _resolve_doc_type(image_url: str, doc_type: str, image_bytes=None):
+    """Settle the document type and the local OCR prefill before the first extraction call.
+
+    Local OCR text is checked for document keywords: doc_type "auto" takes the detected type, and
+    an explicit type the keywords contradict is rerouted. Without local OCR, "auto" asks the model
+    with a one-word classification prompt. Returns (doc_type, prefilled fields).
+    """
+    lines = await _local_lines(image_url, image_bytes)
+    detected = detect_document_type(' '.join(lines)) if lines else None
+    if doc_type == AUTO_DOC_TYPE:
+        doc_type = detected or await _classify_with_model(image_url)
+        if doc_type is None:
+            raise HTTPException(status_code=422, detail="Could not determine the document type; pass doc_type")
+    elif detected and detected != doc_type:
+        logger.warning(f"Requested {doc_type} but the document reads as {detected}; rerouting")
+        doc_type = detected
+
+    prefilled = extract_regex_fields(lines, doc_type) if lines else {}
+    if lines is not None:
+        logger.info(f"Local OCR found: {', '.join(prefilled) or 'nothing'}")
+    return doc_type, prefilled
+
+
+# The document number fields (those with an ocr_pattern), checked against the full value_pattern: the
+# model may answer "1234-5678-9012" or a two-letter passport series that the OCR patterns don't read
+ID_NUMBER_PATTERNS = {
+    doc_type: {field: re.compile(field_meta(EXTRACTION_MODELS[doc_type].model_fields[field])["value_pattern"])
+               for field in patterns}
+    for doc_type, patterns in LOCAL_FIELD_PATTERNS.items()
 }
 
-async def process_document_controller(image_url: str, doc_type: str, max_retries=3):
-    """Main processing function with retry mechanism"""
-    best_result = None
-    retries = 0
+
+def _id_number_mismatch(doc_type: str, parsed: dict) -> bool:
+    """True when the document number is missing or not in doc_type's format, the usual sign of a wrong type"""
+    return any(not pattern.fullmatch(parsed.get(field, "").strip().upper())
+               for field, pattern in ID_NUMBER_PATTERNS.get(doc_type, {}).items())
+
+
+async def _extraction_events(image_url: str, doc_type: str, max_retries=3, retry_policy: RetryPolicy = None,
+                             hedge: bool = None, stream: bool = None, prefilled: dict = None,
+                             reroute: bool = True):
+    """Extraction loop as an async generator of progress events, ending with a "result" event.
+
+    retry_policy decides backoff, which errors are retried and the overall deadline.
+    Attempts are merged field by field, and retries only ask the model for the fields still missing.
+    With hedge (default OCR_HEDGE_ENABLED) a slow attempt gets a parallel duplicate request.
+    prefilled fields (e.g. from local OCR) count as a first attempt, so the model is only asked for the rest.
+    With reroute, a first attempt whose document number doesn't fit doc_type triggers one classification
+    call; if the document is another type, extraction restarts as that type ("rerouted" event).
+    Raises HTTPException (422 partial / 500 failure) when retries are exhausted.
+    """
+    policy = retry_policy or RetryPolicy(max_retries=max_retries)
+    hedge = HEDGE_ENABLED if hedge is None else hedge
+    started_at = time.monotonic()
+    required = REQUIRED_FIELDS[doc_type]
+    votes = FieldVotes()
+    missing_fields = None  # None asks for the full document on the first attempt
+    if prefilled:
+        votes.add(prefilled)
+        missing_fields = votes.missing(required)
+        if not missing_fields:
+            attempt_stats.record(0, "complete")
+            yield {"event": "result", "result": _merged_result(doc_type, votes)}
+            return
     last_error = None
-    
-    while retries <= max_retries:
+    attempt = 0
+
+    while True:
+        error = None
         try:
-            logger.info(f"Attempt {retries+1}/{max_retries+1} for {doc_type} processing")
-
-            # Extract and parse
-            if doc_type == 'aadhar':
-                raw = extract_aadhar_details(image_url)
-                parsed = parse_aadhar_details(raw)
-            elif doc_type == 'pan':
-                raw = extract_pan_card_details(image_url)
-                parsed = parse_pan_details(raw)
-            elif doc_type == 'passport':
-                raw = extract_passport_details(image_url)
-                parsed = parse_passport_details(raw)
+            logger.info(f"Attempt {attempt+1}/{policy.max_retries+1} for {doc_type} processing")
+            requested = missing_fields or required
+            yield {"event": "attempt_started", "attempt": attempt + 1, "requested_fields": requested}
+
+            # Extract and parse, bounded by whatever is left of the request deadline.
+            # Fields parsed mid-stream arrive through the queue while the attempt runs.
+            partials = asyncio.Queue()
+            make_call = lambda fields=missing_fields: llm_extractor.extract(
+                image_url, doc_type, fields, stream=stream, on_partial=partials.put_nowait)
+            if hedge:
+                call = hedged_call(make_call, hedge_delay_for(doc_type),
+                                   lambda parsed: all(parsed.get(f) for f in requested))
             else:
-                raise HTTPException(status_code=400, detail="Unsupported document type")
-
-            # Validate parsed data
-            current_result = {
-                "document_type": doc_type,
-                # "raw_output": raw,
-                "parsed_data": parsed
-            }
-
-            # Check required fields
-            required = REQUIRED_FIELDS[doc_type]
-            missing_fields = [field for field in required if not parsed.get(field, '')]
-            
+                call = _as_list(make_call())
+            task = asyncio.ensure_future(asyncio.wait_for(call, timeout=policy.remaining(started_at)))
+            try:
+                while not task.done():
+                    getter = asyncio.ensure_future(partials.get())
+                    await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+                    if getter.done():
+                        yield {"event": "partial_fields", "attempt": attempt + 1, "fields": getter.result()}
+                    else:
+                        getter.cancel()
+            finally:
+                task.cancel()
+            for parsed in task.result():
+                votes.add(parsed)
+
+            # Retrying the wrong prompt can never succeed: check the type once and start over if needed
+            if reroute and _id_number_mismatch(doc_type, votes.merged()):
+                reroute = False
+                detected = await _classify_with_model(image_url)
+                if detected and detected != doc_type:
+                    logger.warning(f"Document is {detected}, not {doc_type}; rerouting")
+                    yield {"event": "rerouted", "from": doc_type, "to": detected}
+                    doc_type, required = detected, REQUIRED_FIELDS[detected]
+                    votes, missing_fields = FieldVotes(), None
+                    continue
+
+            # Check required fields against the union of all attempts
+            missing_fields = votes.missing(required)
             if not missing_fields:
-                logger.info("All required fields extracted successfully")
-                return current_result
+                logger.info(f"All required fields extracted after {votes.attempts} attempt(s)")
+                attempt_stats.record(attempt + 1, "complete")
+                yield {"event": "result", "result": _merged_result(doc_type, votes)}
+                return
 
             logger.warning(f"Missing fields: {', '.join(missing_fields)}")
-            
-            # Update best result if better than previous
-            if not best_result or (sum(len(v) for v in parsed.values()) > 
-                                 sum(len(v) for v in best_result['parsed_data'].values())):
-                best_result = current_result
-
-            retries += 1
-            if retries <= max_retries:
-                await asyncio.sleep(1)  # Non-blocking sleep for async
+            yield {"event": "fields", "attempt": attempt + 1, "parsed_data": votes.merged(),
+                   "missing_fields": missing_fields}
 
         except Exception as e:
-            logger.error(f"Attempt {retries+1} failed: {str(e)}")
-            last_error = str(e)
-            retries += 1
-            if retries <= max_retries:
-                await asyncio.sleep(1)
+            logger.error(f"Attempt {attempt+1} failed: {str(e) or type(e).__name__}")
+            last_error = str(e) or type(e).__name__
+            error = e
+
+        delay = policy.next_delay(attempt, started_at, error)
+        if delay is None:
+            if error is not None and not policy.is_retryable(error):
+                logger.warning("Not retrying permanent error")
+            break
+        attempt += 1
+        logger.info(f"Retrying in {delay:.2f}s")
+        yield {"event": "retry_scheduled", "attempt": attempt + 1, "delay": round(delay, 3),
+               "error": str(error) if error is not None else None}
+        await asyncio.sleep(delay)  # Non-blocking sleep for async
+
+    attempt_stats.record(attempt + 1, "partial" if votes else "failed")
+
+    # Nothing was extracted because the provider queue turned us away: tell the client to come back
+    if isinstance(error, ProviderBusy) and not votes:
+        retry_after = max(1, round(error.retry_after or 1))
+        raise HTTPException(status_code=503, detail=str(error), headers={"Retry-After": str(retry_after)})
 
     # Final error handling
     error_detail = "Failed to process document after maximum retries"
     if last_error:
         error_detail += f". Last error: {last_error}"
     
-    if best_result:
+    if votes:
         logger.warning("Returning partial results with missing fields")
-        missing = [f for f in REQUIRED_FIELDS[doc_type] if not best_result['parsed_data'].get(f)]
+        missing = votes.missing(required)
         error_detail += f". Missing fields: {', '.join(missing)}"
         raise HTTPException(
             status_code=422,
@@ -92,4 +284,241 @@ async def process_document_controller(image_url: str, doc_type: str, max_retries
         status_code=500,
         detail=error_detail,
         headers={"X-Error-Type": "Processing Failure"},
-    )
\ No newline at end of file
+    )
+
+
+async def _as_list(call):
+    return [await call]
+
+
+async def _extract_with_retries(image_url: str, doc_type: str, max_retries=3, retry_policy: RetryPolicy = None,
+                                hedge: bool = None, prefilled: dict = None):
+    """Run the extraction loop to completion and return the final result"""
+    async for event in _extraction_events(image_url, doc_type, max_retries, retry_policy, hedge,
+                                          prefilled=prefilled):
+        if event["event"] == "result":
+            return event["result"]
+
+
+async def process_document_events(image_url: str, doc_type: str, max_retries=3, hedge: bool = None):
+    """Progress events for the streaming endpoint: attempts, fields found so far, retries, final result.
+
+    Token streaming is always on here so fields can be reported while the model is still answering.
+    Failures are reported as a final "error" event instead of being raised.
+    """
+    if doc_type not in REQUIRED_FIELDS and doc_type != AUTO_DOC_TYPE:
+        yield {"event": "error", "status_code": 400, "detail": "Unsupported document type"}
+        return
+
+    url_key = url_cache_key(doc_type, image_url)
+    cached = await result_cache.get(url_key)
+    if cached:
+        yield {"event": "result", "cached": True, "result": cached}
+        return
+
+    image_bytes = await _fetch_for_pipeline(image_url)
+    model_image_url = image_url
+    if PREPROCESS_IMAGES and image_bytes is not None:
+        model_image_url = await compact_image_url(image_url, image_bytes)
+    try:
+        detected_type, prefilled = await _resolve_doc_type(model_image_url, doc_type, image_bytes)
+        if detected_type != doc_type:
+            yield {"event": "classified", "doc_type": detected_type}
+        if prefilled:
+            yield {"event": "partial_fields", "attempt": 0, "source": "local_ocr", "fields": prefilled}
+        async for event in _extraction_events(model_image_url, detected_type, max_retries, hedge=hedge, stream=True,
+                                              prefilled=prefilled):
+            if event["event"] == "result":
+                result_cache.set(url_key, event["result"])
+            yield event
+    except HTTPException as e:
+        yield {"event": "error", "status_code": e.status_code, "detail": e.detail}
+
+
+async def process_batch_controller(items, max_retries=3, max_concurrency=None):
+    """Process many documents concurrently, bounded by a semaphore; results keep the input order"""
+    concurrency = max(1, min(max_concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    logger.info(f"Processing batch of {len(items)} documents with concurrency {concurrency}")
+
+    async def run_item(index, item):
+        entry = {"index": index, "image_url": item.image_url, "doc_type": item.doc_type}
+        async with semaphore:
+            try:
+                entry["result"] = await process_document_controller(item.image_url, item.doc_type, max_retries)
+                entry["status"] = "success"
+            except HTTPException as e:
+                entry["status"] = "partial" if e.status_code == 422 else "failed"
+                entry["error"] = e.detail
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {str(e)}")
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+        return entry
+
+    results = await asyncio.gather(*(run_item(i, item) for i, item in enumerate(items)))
+    summary = {status: sum(1 for r in results if r["status"] == status)
+               for status in ("success", "partial", "failed")}
+    return {"total": len(results), "concurrency": concurrency, "summary": summary, "results": results}
+
+
+async def process_pdf_controller(pdf_url: str, doc_type: str, max_retries=3):
+    """Extract doc_type fields from every page of a PDF, entirely in memory.
+
+    Pages come from a generator and are pulled only when one of PDF_PAGE_CONCURRENCY slots is
+    free, so a long scan is never decoded all at once. A page whose text layer already has every
+    required field skips the model; otherwise its embedded scan goes through the normal extraction.
+    """
+    if doc_type not in REQUIRED_FIELDS and doc_type != AUTO_DOC_TYPE:
+        raise HTTPException(status_code=400, detail="Unsupported document type")
+    try:
+        # Same checks as every server-side fetch: public http(s) hosts only, each redirect re-checked
+        data = await fetch_image_bytes(pdf_url)
+    except UnsafeURLError as e:
+        raise HTTPException(status_code=400, detail=f"Refusing to fetch PDF: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not fetch PDF: {str(e)}")
+    return await _process_pdf_data(data, doc_type, max_retries)
+
+
+async def _process_pdf_data(data, doc_type: str, max_retries=3):
+    async def run_page(number, text, image):
+        entry = {"page": number}
+        try:
+            page_type = doc_type
+            if page_type == AUTO_DOC_TYPE:
+                page_type = detect_document_type(text) or AUTO_DOC_TYPE
+            votes = FieldVotes()
+            # Text layers usually carry the same "Label: value" lines as the model output
+            if page_type != AUTO_DOC_TYPE and text.strip():
+                votes.add(DOCUMENT_PARSERS[page_type](text))
+            if votes and not votes.missing(REQUIRED_FIELDS[page_type]):
+                entry.update(status="success", source="text", result=_merged_result(page_type, votes))
+                return entry
+            if image is None:
+                entry.update(status="empty", error="No text layer fields or scanned image on this page")
+                return entry
+
+            image_bytes, mime_type = image
+            model_image_url = to_data_url(image_bytes, mime_type)
+            if PREPROCESS_IMAGES:
+                model_image_url = await compact_image_url(model_image_url, image_bytes)
+            page_type, prefilled = await _resolve_doc_type(model_image_url, page_type, image_bytes)
+            entry["result"] = await _extract_with_retries(model_image_url, page_type, max_retries,
+                                                          prefilled=prefilled)
+            entry.update(status="success", source="image")
+        except HTTPException as e:
+            entry["status"] = "partial" if e.status_code == 422 else "failed"
+            entry["error"] = e.detail
+        except Exception as e:
+            logger.error(f"PDF page {number} failed: {str(e)}")
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+        return entry
+
+    pages = iter_pdf_pages(data)
+    del data  # The reader holds its own buffer
+    tasks = []
+    running = set()
+    try:
+        while True:
+            if len(running) >= PDF_PAGE_CONCURRENCY:
+                _, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            # Parsing a page is CPU work (decompression, image decoding): keep it off the event loop
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                break
+            task = asyncio.create_task(run_page(*page))
+            tasks.append(task)
+            running.add(task)
+    except Exception as e:
+        for task in running:
+            task.cancel()
+        logger.error(f"Could not read PDF: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Could not read PDF: {str(e)}")
+
+    results = await asyncio.gather(*tasks)
+    summary = {status: sum(1 for r in results if r["status"] == status)
+               for status in ("success", "partial", "failed", "empty")}
+    return {"document_type": doc_type, "pages": len(results), "summary": summary, "results": results}
+
+
+async def process_upload_controller(data, digest: str, content_type: str, doc_type: str, max_retries=3):
+    """Extract an uploaded image or PDF. The SHA-256 taken while reading the upload is the cache key."""
+    if doc_type not in REQUIRED_FIELDS and doc_type != AUTO_DOC_TYPE:
+        raise HTTPException(status_code=400, detail="Unsupported document type")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    if content_type == "application/pdf":
+        return await _process_pdf_data(data, doc_type, max_retries)
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=415, detail="Upload an image or a PDF")
+
+    key = digest_cache_key(doc_type, digest)
+    cached = await result_cache.get(key)
+    if cached:
+        logger.info(f"Cache hit for uploaded {doc_type} document")
+        return cached
+
+    # The upload buffer is passed around as a memoryview; the data URL is the only other copy
+    model_image_url = await compact_image_url(None, data) if PREPROCESS_IMAGES else None
+    model_image_url = model_image_url or to_data_url(data, content_type)
+    detected_type, prefilled = await _resolve_doc_type(model_image_url, doc_type, data)
+    result = await _extract_with_retries(model_image_url, detected_type, max_retries, prefilled=prefilled)
+    result_cache.set(key, result)
+    return result
+
+
+async def process_bundle_controller(documents, max_retries=3):
+    """Extract several documents of one customer (one per type) with a single multi-image model call.
+
+    Cached documents are served from the cache; the rest share one bundle call. Whatever the bundle
+    answer leaves missing is finished by the per-document retry loop, which only asks for those fields.
+    Complete results are validated against the per-type extraction models.
+    """
+    doc_types = [document.doc_type for document in documents]
+    if not documents or any(doc_type not in REQUIRED_FIELDS for doc_type in doc_types):
+        raise HTTPException(status_code=400, detail="Bundles need documents of type aadhar, pan or passport")
+    if len(set(doc_types)) != len(doc_types):
+        raise HTTPException(status_code=400, detail="A bundle holds at most one document per type")
+
+    results = {}
+    pending = []
+    for document in documents:
+        cached = await result_cache.get(url_cache_key(document.doc_type, document.image_url))
+        if cached:
+            results[document.doc_type] = {"doc_type": document.doc_type, "status": "success",
+                                          "source": "cache", "result": cached}
+        else:
+            pending.append(document)
+
+    bundled = {}
+    if len(pending) > 1:
+        try:
+            bundled = await llm_extractor.extract_bundle([(d.doc_type, d.image_url) for d in pending])
+        except Exception as e:
+            logger.warning(f"Bundle extraction failed, extracting documents separately: {str(e)}")
+
+    async def finish(document):
+        doc_type = document.doc_type
+        entry = {"doc_type": doc_type}
+        prefilled = {key: value for key, value in bundled.get(doc_type, {}).items() if value}
+        try:
+            result = await _extract_with_retries(document.image_url, doc_type, max_retries, prefilled=prefilled)
+            result["parsed_data"] = EXTRACTION_MODELS[doc_type].model_validate(result["parsed_data"]).model_dump()
+            result_cache.set(url_cache_key(doc_type, document.image_url), result)
+            complete_in_bundle = all(prefilled.get(field) for field in REQUIRED_FIELDS[doc_type])
+            entry.update(status="success", source="bundle" if complete_in_bundle else "model", result=result)
+        except HTTPException as e:
+            entry["status"] = "partial" if e.status_code == 422 else "failed"
+            entry["error"] = e.detail
+        except Exception as e:
+            logger.error(f"Bundle document {document.doc_type} failed: {str(e)}")
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+        return entry
+
+    for entry in await asyncio.gather(*(finish(d) for d in pending)):
+        results[entry["doc_type"]] = entry
+    return {"results": [results[doc_type] for doc_type in doc_types]}
@@ -1,12 +1,31 @@
 from typing import Union
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 # from db.config_db import db_client
 
 # Import OCR router
 from routes.ocr_routes import router as ocr_router  # New OCR routes
-
-app = FastAPI()
+from services.image_service import close_http_client
+from services.local_ocr import local_ocr_enabled
+from services.ocr_workers import ocr_pool, OCR_WORKERS
+from services.provider_client import provider_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await provider_client.start()
+    # Local OCR runs in worker processes so it never blocks the request path
+    if local_ocr_enabled() and OCR_WORKERS > 0:
+        ocr_pool.start()
+    yield
+    if ocr_pool.active:
+        await ocr_pool.shutdown()
+    await close_http_client()
+    await provider_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Updated CORS settings to allow requests from the MERN app (http://localhost:5000)
 origins = [
@@ -1,27 +1,144 @@
-from pydantic import BaseModel
-
-class AadharExtraction(BaseModel):
-    Name: str
-    Date_Of_Birth: str
-    Gender: str
-    Aadhar_No: str
-    Address: str
-
-class PANExtraction(BaseModel):
-    panCardNumber: str
-    name: str
-    fatherName: str
-    dateOfBirth: str
-
-class PassportExtraction(BaseModel):
-    Passport_No: str
-    Surname: str
-    Given_Name: str
-    Full_Name: str
-    Nationality: str
-    Sex: str
-    Date_of_Birth: str
-    Place_of_Birth: str
-    Date_of_Issue: str
-    Date_of_Expiry: str
-    Place_of_Issue: str
\ No newline at end of file
+import re
+from functools import lru_cache
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+
+# doc_type value that asks the service to classify the document itself
+AUTO_DOC_TYPE = 'auto'
+
+DATE = r'\d{2}/\d{2}/\d{4}'
+
+
+def schema_field(description: str = None, labels=(), value: str = r'[^\n]+', ocr_pattern: str = None,
+                 derived: bool = False):
+    """A document field plus the metadata everything else is generated from.
+
+    description: hint listed in the extraction prompt (services/prompts.py).
+    labels: regexes for the label printed before the value in free-text answers; by default the
+        field name split into words. value: regex for the value itself. Both feed the text
+        fallback parsers in utils/parsers.py.
+    ocr_pattern: regex reading the field straight off the card's OCR text (services/local_ocr.py).
+    derived: computed from other fields, so not part of REQUIRED_FIELDS.
+    """
+    extra = {"labels": list(labels), "value_pattern": value}
+    if ocr_pattern:
+        extra["ocr_pattern"] = ocr_pattern
+    if derived:
+        extra["derived"] = True
+    return Field("", description=description, json_schema_extra=extra)
+
+
+def field_meta(info) -> dict:
+    return info.json_schema_extra or {}
+
+
+_KEY_MAPS = {}  # model class -> {normalized key: field name}
+
+
+@lru_cache(maxsize=1024)
+def _field_key(name: str) -> str:
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def _as_text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        return ', '.join(_as_text(v) for v in value if _as_text(v))
+    return str(value).strip()
+
+
+class ExtractionModel(BaseModel):
+    """Response model of one document type.
+
+    Validation takes the model's JSON answer as-is: key variants such as "Date Of Birth" or
+    "date_of_birth" are matched to the field names, unknown keys are dropped and values
+    (including nested lists/objects) are flattened to stripped text.
+    """
+
+    @model_validator(mode='before')
+    @classmethod
+    def _match_keys(cls, data):
+        if not isinstance(data, dict):
+            return data
+        by_key = _KEY_MAPS.get(cls)
+        if by_key is None:
+            by_key = _KEY_MAPS[cls] = {_field_key(name): name for name in cls.model_fields}
+        matched = {}
+        for key, value in data.items():
+            name = by_key.get(_field_key(str(key)))
+            if name:
+                matched[name] = _as_text(value)
+        return matched
+
+
+class AadharExtraction(ExtractionModel):
+    Name: str = schema_field("full name as printed", value=r'[A-Za-z\s]+')
+    Date_Of_Birth: str = schema_field("DD/MM/YYYY", labels=[r'Date\s*Of?\s*Birth', 'DOB'], value=DATE)
+    Gender: str = schema_field("M, F or Other", value=r'\w+')
+    Aadhar_No: str = schema_field("12-digit number", labels=[r'Aadhar\s*No', r'Aadhaar\s*Number'],
+                                  value=r'\d{4}[\s-]?\d{4}[\s-]?\d{4}', ocr_pattern=r'\b(\d{4})\s?(\d{4})\s?(\d{4})\b')
+    # Up to the next '*' (markdown) or line end; trailing spaces are stripped afterwards. A lazy match
+    # with a whitespace lookahead here would be quadratic on long runs of spaces.
+    Address: str = schema_field("full address as printed", value=r'[^*\n]+')
+
+class PANExtraction(ExtractionModel):
+    panCardNumber: str = schema_field("10-character alphanumeric PAN", labels=['PAN Card Number'], value=r'\w{10}',
+                                      ocr_pattern=r'\b([A-Z]{5}\d{4}[A-Z])\b')
+    name: str = schema_field("full name as printed", labels=['Name'], value=r'[\w\s]+')
+    fatherName: str = schema_field("father's name as printed", labels=["Father's Name"], value=r'[\w\s]+')
+    dateOfBirth: str = schema_field("DD/MM/YYYY", labels=['Date of Birth'], value=DATE)
+
+class PassportExtraction(ExtractionModel):
+    Passport_No: str = schema_field("passport number", labels=[r'Passport\s*(?:No|Number)'],
+                                    value=r'[A-Z]{1,2}\d{7}', ocr_pattern=r'\b([A-Z]\d{7})\b')
+    Surname: str = schema_field(value=r'[A-Za-z]+')
+    Given_Name: str = schema_field("all given names", value=r'[A-Za-z\s]+')
+    Full_Name: str = schema_field("surname then given names", value=r'[A-Za-z\s]+', derived=True)
+    Nationality: str = schema_field(value=r'[A-Za-z]+')
+    Sex: str = schema_field("M or F", value=r'[MF]')
+    Date_of_Birth: str = schema_field("DD/MM/YYYY", value=DATE)
+    Place_of_Birth: str = schema_field(value=r'[A-Za-z\s]+')
+    Date_of_Issue: str = schema_field("DD/MM/YYYY", value=DATE)
+    Date_of_Expiry: str = schema_field("DD/MM/YYYY", value=DATE)
+    Place_of_Issue: str = schema_field(value=r'[A-Za-z\s]+')
+
+# Response model per document type
+EXTRACTION_MODELS = {
+    'aadhar': AadharExtraction,
+    'pan': PANExtraction,
+    'passport': PassportExtraction,
+}
+
+# Fields an extraction must fill before it counts as complete
+REQUIRED_FIELDS = {
+    doc_type: [name for name, info in model.model_fields.items() if not field_meta(info).get("derived")]
+    for doc_type, model in EXTRACTION_MODELS.items()
+}
+
+
+def response_schema(doc_type: str, fields=None) -> dict:
+    """Bare JSON schema of the answer (string properties only, no parser metadata) for providers
+    that can constrain their output to a schema."""
+    names = list(fields or EXTRACTION_MODELS[doc_type].model_fields)
+    return {
+        "type": "object",
+        "properties": {name: {"type": "string"} for name in names},
+        "required": names,
+        "additionalProperties": False,
+    }
+
+class BatchItem(BaseModel):
+    image_url: str
+    doc_type: str = "aadhar"
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    max_retries: int = 3
+    max_concurrency: Optional[int] = None
+
+class BundleRequest(BaseModel):
+    documents: List[BatchItem]  # One document per type, all for the same customer
+    max_retries: int = 3
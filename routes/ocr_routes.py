@@ -1,12 +1,106 @@
-from fastapi import APIRouter, UploadFile
-from controllers.ocr_controller import process_document_controller
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from controllers.ocr_controller import (process_document_controller, process_batch_controller, process_document_events,
+                                        process_pdf_controller, process_upload_controller, process_bundle_controller,
+                                        document_flights)
+from models.ocr_model import BatchRequest, BundleRequest
+from services.cache_service import result_cache
+from services.hedging import hedge_stats
+from services.backends import backend_router
+from services.retry_policy import attempt_stats
+from services.ocr_service import stream_stats, model_call_stats, token_usage_stats
+from services.image_service import preprocess_stats, read_multipart_upload, UploadTooLarge, MAX_IMAGE_BYTES
+from services.ocr_workers import ocr_pool
+from services.provider_client import provider_client
+from services.rate_limiter import provider_limiter
 
 router = APIRouter(tags=["OCR"])
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # Boundaries and part headers around the file
 
 @router.post("/process-document")
 async def process_document(
     image_url: str,
-    doc_type: str = "aadhar",  # Default to Aadhar processing
-    max_retries: int =3
+    doc_type: str = "aadhar",  # Default to Aadhar processing; "auto" classifies the document first
+    max_retries: int =3,
+    hedge: Optional[bool] = None  # Defaults to OCR_HEDGE_ENABLED
 ):
-    return await process_document_controller(image_url, doc_type, max_retries)
\ No newline at end of file
+    return await process_document_controller(image_url, doc_type, max_retries, hedge=hedge)
+
+
+# GET as well as POST so browsers can consume it with EventSource
+@router.get("/process-document/stream", operation_id="process_document_stream_get")
+@router.post("/process-document/stream", operation_id="process_document_stream")
+async def process_document_stream(
+    image_url: str,
+    doc_type: str = "aadhar",
+    max_retries: int = 3,
+    hedge: Optional[bool] = None
+):
+    async def event_source():
+        async for event in process_document_events(image_url, doc_type, max_retries, hedge):
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.post("/process-batch")
+async def process_batch(request: BatchRequest):
+    return await process_batch_controller(request.items, request.max_retries, request.max_concurrency)
+
+
+@router.post("/process-bundle")
+async def process_bundle(request: BundleRequest):
+    return await process_bundle_controller(request.documents, request.max_retries)
+
+
+@router.post("/process-pdf")
+async def process_pdf(
+    pdf_url: str,
+    doc_type: str = "aadhar",
+    max_retries: int = 3
+):
+    return await process_pdf_controller(pdf_url, doc_type, max_retries)
+
+
+@router.post("/process-upload", openapi_extra={"requestBody": {"required": True, "content": {
+    "multipart/form-data": {"schema": {"type": "object", "required": ["file"],
+                                       "properties": {"file": {"type": "string", "format": "binary"}}}}}}})
+async def process_upload(
+    request: Request,
+    doc_type: str = "aadhar",
+    max_retries: int = 3
+):
+    # Reject bodies that announce an oversized upload before reading any of them
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared = int(content_length)
+        except ValueError:
+            declared = -1
+        if declared < 0:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+        if declared > MAX_IMAGE_BYTES + MULTIPART_OVERHEAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_IMAGE_BYTES} bytes")
+    # The file is read off the body stream with the size limit enforced as it arrives (chunked
+    # uploads carry no Content-Length), and hashed on the way in
+    try:
+        data, digest, content_type = await read_multipart_upload(
+            request.stream(), request.headers.get("content-type", ""), max_bytes=MAX_IMAGE_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await process_upload_controller(data, digest, content_type, doc_type, max_retries)
+
+
+@router.get("/stats")
+async def stats():
+    return {"cache": result_cache.stats(), "hedging": hedge_stats.snapshot(),
+            "streaming": stream_stats.snapshot(), "preprocessing": preprocess_stats.snapshot(),
+            "model_calls": model_call_stats.snapshot(), "ocr_workers": ocr_pool.stats(),
+            "provider": provider_client.stats(), "admission": await provider_limiter.stats(),
+            "coalescing": document_flights.snapshot(), "backends": backend_router.snapshot(),
+            "tokens": token_usage_stats.snapshot(), "attempts": attempt_stats.snapshot()}
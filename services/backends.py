@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+from together import AsyncTogether
+from services.provider_client import PROVIDER_TOTAL_TIMEOUT
+from services.rate_limiter import TokenBucket, ProviderBusy
+from services.retry_policy import RetryPolicy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.getenv("OCR_MODEL", "meta-llama/Llama-Vision-Free")
+# JSON list of {"name", "model", "base_url"?, "api_key_env"?, "rpm"?, "structured_output"?};
+# unset = one backend serving OCR_MODEL
+BACKENDS_CONFIG = os.getenv("OCR_BACKENDS", "")
+# JSON {task: [backend names]}; tasks are doc types, "classify" and "bundle", "*" is the fallback
+ROUTES_CONFIG = os.getenv("OCR_BACKEND_ROUTES", "")
+FAILURE_THRESHOLD = int(os.getenv("OCR_BACKEND_FAILURE_THRESHOLD", "3"))  # Consecutive failures before a cooldown
+COOLDOWN_SECONDS = float(os.getenv("OCR_BACKEND_COOLDOWN_SECONDS", "30"))
+EXPLORE_RATE = float(os.getenv("OCR_BACKEND_EXPLORE_RATE", "0.05"))  # Share of calls sent to a non-best backend
+# Longest one backend gets before the call fails over; keep it well under OCR_REQUEST_DEADLINE_SECONDS. 0 = no limit
+ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("OCR_BACKEND_ATTEMPT_TIMEOUT_SECONDS", "25"))
+# Ask for schema-constrained JSON (response_format) by default; a backend that rejects it is switched off
+STRUCTURED_OUTPUT = os.getenv("OCR_STRUCTURED_OUTPUT", "1") == "1"
+
+EWMA_ALPHA = 0.2
+ERROR_PENALTY = 4  # A 25% error rate doubles a backend's effective latency
+
+
+class Backend:
+    """One model endpoint and what the router has observed about it."""
+
+    def __init__(self, name: str, model: str, base_url: str = None, api_key_env: str = None, rpm: float = 0,
+                 structured_output: bool = STRUCTURED_OUTPUT):
+        self.name = name
+        self.model = model
+        self.structured_output = structured_output
+        # None means the default Together client (TOGETHER_API_KEY / TOGETHER_BASE_URL)
+        self.client = None
+        if base_url or api_key_env:
+            self.client = AsyncTogether(api_key=os.getenv(api_key_env or "TOGETHER_API_KEY"), base_url=base_url,
+                                        timeout=PROVIDER_TOTAL_TIMEOUT)
+        self.quota = TokenBucket(rpm) if rpm else None
+        self.latency = {}  # task -> EWMA seconds
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.failures = 0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def has_quota(self) -> bool:
+        return self.quota is None or self.quota.wait_time(1) == 0
+
+    def score(self, task: str) -> float:
+        """Expected latency for task, inflated by the error rate.
+
+        Untried backends score 0 so they get tried; one that is failing and has never answered
+        this task scores infinity, behind every backend with a known latency.
+        """
+        latency = self.latency.get(task)
+        if latency is None:
+            return float("inf") if self.consecutive_failures else 0.0
+        return latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def record_success(self, task: str, seconds: float):
+        previous = self.latency.get(task)
+        self.latency[task] = seconds if previous is None else previous + EWMA_ALPHA * (seconds - previous)
+        self.error_rate -= EWMA_ALPHA * self.error_rate
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        self.error_rate += EWMA_ALPHA * (1 - self.error_rate)
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURE_THRESHOLD:
+            # After the cooldown one call is let through again; another failure restarts it
+            self.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+            logger.warning(f"Backend {self.name} failed {self.consecutive_failures} times in a row; "
+                           f"cooling down for {COOLDOWN_SECONDS:g}s")
+
+    def snapshot(self) -> dict:
+        return {
+            "model": self.model,
+            "structured_output": self.structured_output,
+            "calls": self.calls,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate, 4),
+            "latency_ms": {task: round(seconds * 1000, 1) for task, seconds in self.latency.items()},
+            "cooling_down": not self.available(),
+            "quota_available": round(self.quota.level, 2) if self.quota else None,
+        }
+
+
+class BackendRouter:
+    """Picks the backend for each model call and fails over to the next one on transient errors.
+
+    Healthy backends with quota left are ordered by observed latency for the task (weighted by
+    their error rate); backends out of quota come next and those cooling down after repeated
+    failures last. A small share of calls goes to a non-best backend so its numbers stay fresh.
+    Permanent errors (as classified by RetryPolicy) are raised straight away: another backend
+    would get the same bad request, and they say nothing about the backend's health.
+    """
+
+    def __init__(self, backends: list, routes: dict, retry_policy: RetryPolicy = None,
+                 attempt_timeout: float = ATTEMPT_TIMEOUT_SECONDS):
+        self.backends = {backend.name: backend for backend in backends}
+        self.routes = routes
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.attempt_timeout = attempt_timeout or None
+        self.failovers = 0
+
+    def candidates(self, task: str) -> list:
+        names = self.routes.get(task) or self.routes.get("*") or list(self.backends)
+        backends = [self.backends[name] for name in names]
+        ready = sorted((b for b in backends if b.available() and b.has_quota()), key=lambda b: b.score(task))
+        if len(ready) > 1 and random.random() < EXPLORE_RATE:
+            ready.insert(0, ready.pop(random.randrange(1, len(ready))))
+        throttled = [b for b in backends if b.available() and not b.has_quota()]
+        cooling = sorted((b for b in backends if not b.available()), key=lambda b: b.cooldown_until)
+        return ready + throttled + cooling
+
+    async def call(self, task: str, attempt):
+        """Run attempt(backend) on the best backend for task, failing over down the candidate list."""
+        last_error = None
+        for backend in self.candidates(task):
+            if last_error is not None:
+                self.failovers += 1
+                logger.warning(f"Failing over {task} call to backend {backend.name}")
+            if backend.quota:
+                backend.quota.take(1)
+            backend.calls += 1
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(attempt(backend), timeout=self.attempt_timeout)
+            except ProviderBusy:
+                raise  # Our own admission limit: another backend would not be admitted either
+            except Exception as e:
+                if not self.retry_policy.is_retryable(e):
+                    raise
+                logger.warning(f"Backend {backend.name} failed: {type(e).__name__}: {str(e)}")
+                backend.record_failure()
+                last_error = e
+                continue
+            backend.record_success(task, time.perf_counter() - started)
+            return result
+        raise last_error
+
+    def snapshot(self) -> dict:
+        return {
+            "failovers": self.failovers,
+            "backends": {name: backend.snapshot() for name, backend in self.backends.items()},
+        }
+
+
+def load_backends(backends_config: str = BACKENDS_CONFIG, routes_config: str = ROUTES_CONFIG) -> BackendRouter:
+    backends = [Backend(**entry) for entry in json.loads(backends_config)] if backends_config else [
+        Backend("default", DEFAULT_MODEL)]
+    routes = json.loads(routes_config) if routes_config else {}
+    names = {backend.name for backend in backends}
+    for task, route in routes.items():
+        unknown = set(route) - names
+        if unknown:
+            raise ValueError(f"OCR_BACKEND_ROUTES[{task!r}] names unknown backends: {', '.join(sorted(unknown))}")
+    return BackendRouter(backends, routes)
+
+
+backend_router = load_backends()
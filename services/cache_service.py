@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.getenv("OCR_CACHE_TTL_SECONDS", "86400"))
+CACHE_DB_PATH = os.getenv("OCR_CACHE_DB_PATH")  # Unset disables the on-disk tier
+CACHE_HASH_CONTENT = os.getenv("OCR_CACHE_HASH_CONTENT", "0") == "1"
+
+
+def url_cache_key(doc_type: str, image_url: str) -> str:
+    return f"url:{doc_type}:{image_url}"
+
+
+def content_cache_key(doc_type: str, data) -> str:
+    """Key on the SHA-256 of the image bytes so the same card at another URL still hits."""
+    return digest_cache_key(doc_type, hashlib.sha256(data).hexdigest())
+
+
+def digest_cache_key(doc_type: str, digest: str) -> str:
+    """Content key from an already computed SHA-256 hex digest (e.g. hashed while uploading)."""
+    return f"sha256:{doc_type}:{digest}"
+
+
+class ResultCache:
+    """Two-tier result cache: an in-process LRU with TTL, optionally backed by SQLite.
+
+    The SQLite file may be shared by several workers, so a query can wait on another process's
+    write: disk lookups run in a worker thread and disk writes in the background, never on the
+    event loop.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS,
+                 db_path: str = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._db.commit()
+
+    async def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._disk_get, key)
+            if row and row[1] > now:
+                value = json.loads(row[0])
+                with self._lock:
+                    self._store(key, value, row[1])
+                    self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: dict):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self._db is not None:
+            # Serialised now, so later changes to value do not leak into the stored copy
+            row = (key, json.dumps(value), expires_at)
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._disk_set(row)
+            else:
+                loop.run_in_executor(None, self._disk_set, row)
+
+    def _disk_get(self, key: str):
+        try:
+            with self._db_lock:
+                return self._db.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache read failed: {str(e)}")
+            return None
+
+    def _disk_set(self, row):
+        try:
+            with self._db_lock:
+                self._db.execute("INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)", row)
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed: {str(e)}")
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def purge_expired(self):
+        """Drop expired entries from both tiers."""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+                del self._entries[key]
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "disk_enabled": self._db is not None,
+        }
+
+
+result_cache = ResultCache(db_path=CACHE_DB_PATH)
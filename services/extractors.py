@@ -0,0 +1,77 @@
+import abc
+import json
+import asyncio
+import logging
+from fastapi import HTTPException
+from services.ocr_service import (extract_aadhar_details_async, extract_pan_card_details_async,
+                                  extract_passport_details_async, classify_document_async,
+                                  extract_bundle_async)
+from services import local_ocr
+from services.ocr_workers import ocr_pool
+from utils.parsers import (parse_aadhar_details, parse_pan_details, parse_passport_details, detect_document_type,
+                           DOCUMENT_PARSERS)
+from utils.json_extract import extract_json_object
+
+logger = logging.getLogger(__name__)
+
+
+class Extractor(abc.ABC):
+    """Common interface for extraction backends.
+
+    extract() returns a dict of parsed fields for doc_type. fields, when given, limits the
+    extraction to those keys. classify() names the document type, or returns None if the
+    backend can't tell.
+    """
+
+    name = "extractor"
+
+    @abc.abstractmethod
+    async def extract(self, image_url: str, doc_type: str, fields=None, stream=None, on_partial=None) -> dict:
+        """Parsed fields of the document at image_url."""
+
+    async def classify(self, image_url: str):
+        return None
+
+
+class LLMExtractor(Extractor):
+    """Llama-Vision through the Together API."""
+
+    name = "llm"
+
+    async def extract(self, image_url: str, doc_type: str, fields=None, stream=None, on_partial=None) -> dict:
+        if doc_type == 'aadhar':
+            raw = await extract_aadhar_details_async(image_url, fields, stream, on_partial)
+            return parse_aadhar_details(raw)
+        elif doc_type == 'pan':
+            raw = await extract_pan_card_details_async(image_url, fields, stream, on_partial)
+            return parse_pan_details(raw)
+        elif doc_type == 'passport':
+            raw = await extract_passport_details_async(image_url, fields, stream, on_partial)
+            return parse_passport_details(raw)
+        raise HTTPException(status_code=400, detail="Unsupported document type")
+
+    async def classify(self, image_url: str):
+        return detect_document_type(await classify_document_async(image_url) or "")
+
+    async def extract_bundle(self, documents) -> dict:
+        """Extract [(doc_type, image_url), ...] with one call; returns {doc_type: parsed fields}."""
+        answer = extract_json_object(await extract_bundle_async(documents) or "") or {}
+        sections = {str(key).lower(): value for key, value in answer.items() if isinstance(value, dict)}
+        return {doc_type: DOCUMENT_PARSERS[doc_type](json.dumps(sections.get(doc_type, {})))
+                for doc_type, _ in documents}
+
+
+class LocalOCRReader:
+    """CPU-only EasyOCR pass over the image bytes. The controller looks for document keywords in
+    the lines and reads the fields a regex can match reliably (services/local_ocr.py)."""
+
+    async def read_lines(self, image_bytes) -> list:
+        # OCR is CPU-bound and holds the GIL: use the worker processes when they are running,
+        # otherwise at least keep it off the event loop
+        if ocr_pool.active:
+            return await ocr_pool.submit(image_bytes)
+        return await asyncio.to_thread(local_ocr.read_text, image_bytes)
+
+
+llm_extractor = LLMExtractor()
+local_ocr_reader = LocalOCRReader()
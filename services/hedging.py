@@ -0,0 +1,88 @@
+import os
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+HEDGE_ENABLED = os.getenv("OCR_HEDGE_ENABLED", "0") == "1"
+HEDGE_DELAY_SECONDS = float(os.getenv("OCR_HEDGE_DELAY_SECONDS", "4"))
+# Doc types that often come back with missing fields get their hedge launched right away
+HEDGE_IMMEDIATE_TYPES = {t.strip() for t in os.getenv("OCR_HEDGE_IMMEDIATE_TYPES", "").split(",") if t.strip()}
+
+
+class HedgeStats:
+    """Counters for tuning the latency/cost trade-off of hedged requests."""
+
+    def __init__(self):
+        self.calls = 0      # hedged_call invocations
+        self.launched = 0   # second requests actually started
+        self.wins = 0       # hedge finished first with a complete result
+        self.merged = 0     # neither was complete alone, both results were used
+        self.wasted = 0     # requests cancelled or whose result was thrown away
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "launched": self.launched,
+            "wins": self.wins,
+            "merged": self.merged,
+            "wasted": self.wasted,
+            "launch_rate": round(self.launched / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+hedge_stats = HedgeStats()
+
+
+def hedge_delay_for(doc_type: str) -> float:
+    return 0.0 if doc_type in HEDGE_IMMEDIATE_TYPES else HEDGE_DELAY_SECONDS
+
+
+async def hedged_call(make_call, delay: float, is_complete):
+    """Run make_call() and, if it has not finished after delay seconds, a second copy in parallel.
+
+    The first complete result wins and the other request is cancelled. When the first
+    finisher is incomplete or fails, the other one is awaited too. Returns the list of
+    successful results (one or two) for the caller to merge; raises if every call failed.
+    """
+    hedge_stats.calls += 1
+    primary = asyncio.ensure_future(make_call())
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if primary in done:
+            return [primary.result()]
+
+        logger.info(f"Primary extraction still running after {delay:.1f}s, launching hedge")
+        hedge = asyncio.ensure_future(make_call())
+        tasks.append(hedge)
+        hedge_stats.launched += 1
+
+        results = []
+        errors = []
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                    continue
+                result = task.result()
+                if is_complete(result) and not results:
+                    if task is hedge:
+                        hedge_stats.wins += 1
+                    hedge_stats.wasted += len(pending)
+                    return [result]
+                results.append(result)
+
+        if not results:
+            raise errors[0]
+        if len(results) == 2:
+            hedge_stats.merged += 1
+        else:
+            hedge_stats.wasted += 1
+        return results
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
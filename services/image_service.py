@@ -0,0 +1,292 @@
+import io
+import os
+import time
+import base64
+import socket
+import hashlib
+import asyncio
+import logging
+import ipaddress
+import httpx
+from PIL import Image, ImageChops, ImageOps
+from python_multipart.multipart import MultipartParser, parse_options_header
+from python_multipart.exceptions import MultipartParseError
+
+logger = logging.getLogger(__name__)
+
+MAX_IMAGE_BYTES = int(os.getenv("OCR_MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+FETCH_TIMEOUT_SECONDS = float(os.getenv("OCR_FETCH_TIMEOUT_SECONDS", "15"))
+# Image URLs come from clients, so server-side fetches only go to public addresses. Comma-separated
+# hosts (".example.com" also matches subdomains) restrict them further; unset allows any public host.
+FETCH_ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv("OCR_FETCH_ALLOWED_HOSTS", "").split(",")
+                       if host.strip()}
+FETCH_ALLOW_PRIVATE = os.getenv("OCR_FETCH_ALLOW_PRIVATE", "0") == "1"  # Private/loopback hosts, e.g. in-house storage
+MAX_FETCH_REDIRECTS = 5
+
+# Optional stage: fetch the image ourselves, shrink it and send it inline instead of the URL
+PREPROCESS_IMAGES = os.getenv("OCR_PREPROCESS_IMAGES", "0") == "1"
+MAX_IMAGE_SIDE = int(os.getenv("OCR_MAX_IMAGE_SIDE", "1600"))
+IMAGE_FORMAT = os.getenv("OCR_IMAGE_FORMAT", "JPEG").upper()  # JPEG or WEBP
+IMAGE_QUALITY = int(os.getenv("OCR_IMAGE_QUALITY", "85"))
+BORDER_THRESHOLD = 24  # Pixel difference from the corner colour that counts as content
+
+# Shared pooled client, created lazily on first fetch so imports stay cheap
+_http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled HTTP client used to fetch document images."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=FETCH_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            follow_redirects=False,  # Redirects are followed by fetch_image_bytes, which checks every hop
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class UnsafeURLError(ValueError):
+    """The URL points somewhere the server must not fetch from."""
+
+
+class UploadTooLarge(ValueError):
+    """The uploaded file is over MAX_IMAGE_BYTES."""
+
+
+def _host_allowed(host: str) -> bool:
+    if not FETCH_ALLOWED_HOSTS:
+        return True
+    return any(host == allowed or (allowed.startswith(".") and host.endswith(allowed))
+               for allowed in FETCH_ALLOWED_HOSTS)
+
+
+async def check_fetch_url(url: str):
+    """Raise UnsafeURLError unless url is http(s), its host is allowed and every address it
+    resolves to is public (no private, loopback, link-local or metadata addresses).
+
+    The HTTP client resolves the name again when it connects, so a DNS-rebinding host can still
+    slip through; set OCR_FETCH_ALLOWED_HOSTS where that matters.
+    """
+    try:
+        parsed = httpx.URL(url)
+    except httpx.InvalidURL as e:
+        raise UnsafeURLError(f"Invalid URL: {str(e)}")
+    if parsed.scheme not in ("http", "https"):
+        raise UnsafeURLError(f"Only http and https URLs can be fetched, not {parsed.scheme or 'none'!r}")
+    host = parsed.host.lower().rstrip(".")
+    if not host:
+        raise UnsafeURLError("URL has no host")
+    if not _host_allowed(host):
+        raise UnsafeURLError(f"Host {host} is not in OCR_FETCH_ALLOWED_HOSTS")
+    if FETCH_ALLOW_PRIVATE:
+        return
+
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise UnsafeURLError(f"Cannot resolve {host}: {str(e)}")
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise UnsafeURLError(f"Host {host} resolves to non-public address {address}")
+
+
+async def fetch_image_bytes(image_url: str) -> bytes:
+    """Download the image behind image_url (or decode a data URL), enforcing MAX_IMAGE_BYTES.
+
+    The URL and every redirect target go through check_fetch_url first.
+    """
+    if image_url.startswith("data:"):
+        _, _, payload = image_url.partition(",")
+        # Every 4 base64 characters carry 3 bytes: refuse oversized payloads before decoding them
+        if len(payload) > 4 * (MAX_IMAGE_BYTES // 3 + 1):
+            raise ValueError(f"Image exceeds {MAX_IMAGE_BYTES} bytes")
+        return base64.b64decode(payload, validate=True)
+
+    client = get_http_client()
+    url = image_url
+    for _ in range(MAX_FETCH_REDIRECTS + 1):
+        await check_fetch_url(url)
+        async with client.stream("GET", url) as response:
+            if response.is_redirect:
+                url = str(response.url.join(response.headers["location"]))
+                continue
+            response.raise_for_status()
+            chunks = bytearray()
+            async for chunk in response.aiter_bytes():
+                chunks += chunk
+                if len(chunks) > MAX_IMAGE_BYTES:
+                    raise ValueError(f"Image exceeds {MAX_IMAGE_BYTES} bytes")
+            return bytes(chunks)
+    raise UnsafeURLError(f"More than {MAX_FETCH_REDIRECTS} redirects")
+
+
+async def read_multipart_upload(chunks, content_type: str, field: str = "file", max_bytes: int = MAX_IMAGE_BYTES):
+    """Read one file field straight off a multipart/form-data body stream, hashing as it arrives.
+
+    chunks is the raw request body (e.g. Request.stream()). Nothing is spooled to disk, and reading
+    stops at the first chunk that takes the file past max_bytes, whether or not the client sent a
+    Content-Length. Returns (memoryview, SHA-256 hex digest, part content type). Raises
+    UploadTooLarge, or ValueError for a body that is not multipart or lacks the field.
+    """
+    mime_type, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if mime_type != b"multipart/form-data" or not boundary:
+        raise ValueError("Expected a multipart/form-data body")
+
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    part = {"headers": {}, "field": b"", "value": b""}
+    found = {}
+
+    def on_part_begin():
+        part.update(headers={}, field=b"", value=b"")
+
+    def on_header_field(data, start, end):
+        part["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part.update(field=b"", value=b"")
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["wanted"] = disposition.get(b"name") == field.encode() and not found
+        if part["wanted"]:
+            found["content_type"] = part["headers"].get(b"content-type", b"").decode("latin-1")
+
+    def on_part_data(data, start, end):
+        if not part["wanted"]:
+            return
+        if len(buffer) + end - start > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        chunk = data[start:end]
+        digest.update(chunk)
+        buffer.extend(chunk)
+
+    def on_part_end():
+        if part["wanted"]:
+            found["complete"] = True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin, "on_header_field": on_header_field, "on_header_value": on_header_value,
+        "on_header_end": on_header_end, "on_headers_finished": on_headers_finished, "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    try:
+        async for chunk in chunks:
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError as e:
+        raise ValueError(f"Malformed multipart body: {str(e)}")
+    if not found:
+        raise ValueError(f"Missing multipart {field} field")
+    if not found.get("complete"):
+        raise ValueError("Truncated multipart body")
+    return memoryview(buffer), digest.hexdigest(), found["content_type"]
+
+
+class PreprocessStats:
+    """Upload bytes saved by the preprocessing stage and the time it costs."""
+
+    def __init__(self):
+        self.images = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": PREPROCESS_IMAGES,
+            "images": self.images,
+            "failures": self.failures,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved_ratio": round(1 - self.bytes_out / self.bytes_in, 4) if self.bytes_in else 0.0,
+            "avg_preprocess_ms": round(self.seconds * 1000 / self.images, 2) if self.images else 0.0,
+        }
+
+
+preprocess_stats = PreprocessStats()
+
+
+def _crop_borders(img: Image.Image) -> Image.Image:
+    """Trim uniform margins (scanner bed, desk) around the card."""
+    background = Image.new(img.mode, img.size, img.getpixel((0, 0)))
+    diff = ImageChops.difference(img, background).convert("L")
+    bbox = diff.point(lambda p: 255 if p > BORDER_THRESHOLD else 0).getbbox()
+    if bbox and (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) < 0.9 * img.width * img.height:
+        return img.crop(bbox)
+    return img
+
+
+def compact_image(data: bytes):
+    """Decode, crop, downscale to MAX_IMAGE_SIDE and re-encode. Returns (bytes, mime type)."""
+    with Image.open(io.BytesIO(data)) as img:
+        # Let the JPEG decoder skip detail we are about to throw away
+        img.draft("RGB", (MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+    img = _crop_borders(img)
+    img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+
+    out = io.BytesIO()
+    img.save(out, format=IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    return out.getvalue(), f"image/{IMAGE_FORMAT.lower()}"
+
+
+# Multiple of 3, so every chunk but the last encodes without padding
+DATA_URL_CHUNK_BYTES = 3 * 256 * 1024
+
+
+def to_data_url(data, mime_type: str) -> str:
+    """Base64 data URL for data, built up a chunk at a time.
+
+    Appending to a string nothing else references resizes it in place, so the URL is the
+    only full-size copy; encoding the whole buffer first would hold it twice.
+    """
+    data = memoryview(data)
+    url = f"data:{mime_type};base64,"
+    for start in range(0, len(data), DATA_URL_CHUNK_BYTES):
+        url += base64.b64encode(data[start:start + DATA_URL_CHUNK_BYTES]).decode("ascii")
+    return url
+
+
+async def compact_image_url(image_url: str, data: bytes = None) -> str:
+    """Data URL of the compacted image, or the original URL if preprocessing fails or doesn't help.
+
+    Uploads pass image_url=None with the bytes, and build their own data URL when None comes back.
+    """
+    started = time.perf_counter()
+    try:
+        if data is None:
+            data = await fetch_image_bytes(image_url)
+        compact, mime_type = await asyncio.to_thread(compact_image, data)
+    except Exception as e:
+        preprocess_stats.failures += 1
+        logger.warning(f"Image preprocessing failed, sending original URL: {str(e)}")
+        return image_url
+
+    preprocess_stats.images += 1
+    preprocess_stats.seconds += time.perf_counter() - started
+    preprocess_stats.bytes_in += len(data)
+    if len(compact) >= len(data):
+        preprocess_stats.bytes_out += len(data)
+        return image_url
+    preprocess_stats.bytes_out += len(compact)
+    logger.info(f"Compacted image from {len(data)} to {len(compact)} bytes")
+    return to_data_url(compact, mime_type)
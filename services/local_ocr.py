@@ -0,0 +1,74 @@
+import os
+import re
+import logging
+from functools import lru_cache
+from models.ocr_model import EXTRACTION_MODELS, field_meta
+
+logger = logging.getLogger(__name__)
+
+# CPU-only EasyOCR fast path for fields a regex can read straight off the card.
+# easyocr/opencv/numpy are optional: pip install easyocr opencv-python-headless
+# The requested setting; local_ocr_enabled() says whether it is actually in effect
+LOCAL_OCR_ENABLED = os.getenv("OCR_LOCAL_ENGINE", "0") == "1"
+LOCAL_OCR_LANGUAGES = [lang.strip() for lang in os.getenv("OCR_LOCAL_LANGUAGES", "en").split(",") if lang.strip()]
+
+# Fields that are fully determined by their printed format (ocr_pattern in the response models)
+LOCAL_FIELD_PATTERNS = {
+    doc_type: {name: re.compile(field_meta(info)["ocr_pattern"])
+               for name, info in model.model_fields.items() if "ocr_pattern" in field_meta(info)}
+    for doc_type, model in EXTRACTION_MODELS.items()
+}
+
+
+def local_ocr_available() -> bool:
+    try:
+        import easyocr  # noqa: F401
+        import cv2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=1)
+def local_ocr_enabled() -> bool:
+    """OCR_LOCAL_ENGINE, checked once against the optional dependencies."""
+    if LOCAL_OCR_ENABLED and not local_ocr_available():
+        logger.warning("OCR_LOCAL_ENGINE is set but easyocr/opencv are not installed; local OCR disabled")
+        return False
+    return LOCAL_OCR_ENABLED
+
+
+@lru_cache(maxsize=1)
+def get_reader():
+    """Load the EasyOCR model once per process."""
+    import easyocr
+    logger.info("Loading EasyOCR reader")
+    return easyocr.Reader(LOCAL_OCR_LANGUAGES, gpu=False)
+
+
+def decode_image(data):
+    """Decode encoded image bytes (bytes or memoryview) to a grayscale array without copying the input."""
+    import cv2
+    import numpy as np
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise ValueError("Could not decode image")
+    return img
+
+
+def read_text(data) -> list:
+    """OCR the image bytes and return the recognised text lines."""
+    from services.preprocessing import get_preprocessor, image_dpi
+    img = get_preprocessor().run(decode_image(data), image_dpi(data))
+    return [text for text in get_reader().readtext(img, detail=0, paragraph=False)]
+
+
+def extract_regex_fields(lines, doc_type: str) -> dict:
+    """Pull the format-determined fields for doc_type out of OCR text lines."""
+    full_text = ' '.join(lines).upper()
+    fields = {}
+    for field, pattern in LOCAL_FIELD_PATTERNS.get(doc_type, {}).items():
+        match = pattern.search(full_text)
+        if match:
+            fields[field] = ' '.join(match.groups())
+    return fields
@@ -1,123 +1,57 @@
 import os
-from together import Together
+import json
+import time
+import logging
+from together import error as together_error
 from dotenv import load_dotenv
+from models.ocr_model import REQUIRED_FIELDS, response_schema
+from services.provider_client import provider_client
+from services.backends import backend_router, DEFAULT_MODEL
+from services.prompts import get_prompt, DOCUMENT_NAMES, PROMPT_VERSION
+from utils.json_extract import JSONObjectScanner
 
 load_dotenv()
-client = Together(api_key=os.getenv("TOGETHER_API_KEY"))
+logger = logging.getLogger(__name__)
+# Every model call goes through services.backends (routing, failover) and services.provider_client
+# (pooled session, rate limits)
 
-def extract_aadhar_details(image_url: str):
-    """Extract key-value pairs from an Aadhar card image."""
-    response = client.chat.completions.create(
-        model="meta-llama/Llama-Vision-Free",
-        messages=[
-            {
-                "role": "system",
-                "content": """
-                You are an expert data extractor specializing in Aadhar card information. 
-                For the given Aadhar card image, STRICTLY extract the following details:
-
-                1. Extract ONLY the exact values for these fields
-                2. Return ONLY a valid JSON format
-                3. Do not add any explanatory text
-
-                Required Fields:
-                - Name: Full name as printed
-                - Date Of Birth: Exact date format DD/MM/YYYY
-                - Gender: M, F, or Other
-                - Aadhar No: Exact 12-digit Aadhar number
-                - Address: Full address as printed
-
-                Output Format (MANDATORY):
-                {
-                  "Name": "",
-                  "Date_Of_Birth": "",
-                  "Gender": "",
-                  "Aadhar_No": "",
-                  "Address": ""
-                }
+# Stream tokens and hang up as soon as the JSON object holds every required field
+STREAM_TOKENS = os.getenv("OCR_STREAM_TOKENS", "0") == "1"
+# Extraction wants the single most likely reading, not variety
+TEMPERATURE = float(os.getenv("OCR_TEMPERATURE", "0"))
 
-                DO NOT include any additional text or explanation.
-                ONLY return the JSON object with extracted values.
-                """
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "Extract required key-value pairs from the Aadhar card image"
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": image_url
-                        }
-                    }
-                ]
+
+def _build_request(system_prompt: str, user_text: str, image_url: str, max_tokens: int):
+    """Build the chat completion arguments for one image and its prompts."""
+    return _chat_request(system_prompt, [
+        {
+            "type": "text",
+            "text": user_text
+        },
+        {
+            "type": "image_url",
+            "image_url": {
+                "url": image_url
             }
-        ],
-        max_tokens=500,
-        temperature=0.7,
-        top_p=0.7,
-        top_k=50,
-        repetition_penalty=1,
-        stop=["<|eot_id|>", "<|eom_id|>"],
-        stream=False
-    )
-    print(image_url)
-    return response.choices[0].message.content
+        }
+    ], max_tokens)
 
-def extract_pan_card_details(image_url: str):
 
-    """Extract key-value pairs from a PAN Card image."""
-    response = client.chat.completions.create(
-        model="meta-llama/Llama-Vision-Free",
+def _chat_request(system_prompt: str, user_content: list, max_tokens: int):
+    return dict(
+        model=DEFAULT_MODEL,  # Replaced by the routed backend's model on the async path
         messages=[
             {
                 "role": "system",
-                "content": """
-                You are an expert data extractor. For the given PAN card image, STRICTLY extract the following details:
-
-1. Extract ONLY the exact values for these fields
-2. Return ONLY a valid JSON format
-3. Do not add any explanatory text
-
-Required Fields:
-- PAN Card Number: Exact 10-digit alphanumeric code
-- Name: Full name exactly as printed
-- Father's Name: Exact father's name 
-- Date of Birth: Exact date printed
-
-Output Format (MANDATORY):
-{
-  "panCardNumber": "",
-  "name": "",
-  "fatherName": "",
-  "dateOfBirth": ""
-}
-DO NOT include any additional text or explanation.
-ONLY return the JSON object with extracted values.
-
-                """
+                "content": system_prompt
             },
             {
                 "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "Extract important key-value pairs from it"
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": image_url
-                        }
-                    }
-                ]
+                "content": user_content
             }
         ],
-        max_tokens=300,  # Set a reasonable max token limit
-        temperature=0.7,
+        max_tokens=max_tokens,
+        temperature=TEMPERATURE,
         top_p=0.7,
         top_k=50,
         repetition_penalty=1,
@@ -125,80 +59,254 @@ ONLY return the JSON object with extracted values.
         stream=False
     )
 
-    # Directly access the response content
-    return response.choices[0].message.content
-    
 
-def extract_passport_details(image_url: str):
-    """Extract key-value pairs from a Passport image."""
-    response = client.chat.completions.create(
-        model="meta-llama/Llama-Vision-Free",
-        messages=[
-            {
-                "role": "system",
-                "content": """
-                You are an expert data extractor specializing in passport information. 
-                For the given passport image, STRICTLY extract the following details:
-
-                1. Extract ONLY the exact values for these fields
-                2. Return ONLY a valid JSON format
-                3. Do not add any explanatory text
-
-                Required Fields:
-                - Passport Number: Exact alphanumeric passport number
-                - Surname: Exact surname as printed
-                - Given Name: Full given name(s)
-                - Nationality: Exact nationality
-                - Sex: M or F
-                - Date of Birth: Exact date format DD/MM/YYYY
-                - Place of Birth: Exact location
-                - Date of Issue: Exact date format DD/MM/YYYY
-                - Date of Expiry: Exact date format DD/MM/YYYY
-                - Place of Issue: Exact location
-
-                Output Format (MANDATORY):
-                {
-                  "Passport_No": "",
-                  "Surname": "",
-                  "Given_Name": "",
-                  "Full_Name": "",
-                  "Nationality": "",
-                  "Sex": "",
-                  "Date_of_Birth": "",
-                  "Place_of_Birth": "",
-                  "Date_of_Issue": "",
-                  "Date_of_Expiry": "",
-                  "Place_of_Issue": ""
-                }
+# Retry prompts only ask for what is still missing, so they get a much smaller token budget
+FIELD_TOKEN_BUDGET = 40
+
+
+def _focused_request(document: str, fields, image_url: str, max_tokens: int):
+    """Request for a retry that only asks for the given fields."""
+    prompt = get_prompt("focused").format(document=document, fields=", ".join(fields))
+    return _build_request(prompt, f"Extract {', '.join(fields)} from the {document} image",
+                          image_url, max_tokens=min(max_tokens, FIELD_TOKEN_BUDGET * (len(fields) + 1)))
+
+
+MAX_TOKENS = {
+    'aadhar': 500,
+    'pan': 300,  # Set a reasonable max token limit
+    'passport': 500,  # Increased token limit for passport details
+}
+
+
+def _aadhar_request(image_url: str, fields=None):
+    if fields:
+        return _focused_request(DOCUMENT_NAMES['aadhar'], fields, image_url, max_tokens=MAX_TOKENS['aadhar'])
+    return _build_request(get_prompt('aadhar.system'), get_prompt('aadhar.user'),
+                          image_url, max_tokens=MAX_TOKENS['aadhar'])
+
+
+def _pan_request(image_url: str, fields=None):
+    if fields:
+        return _focused_request(DOCUMENT_NAMES['pan'], fields, image_url, max_tokens=MAX_TOKENS['pan'])
+    return _build_request(get_prompt('pan.system'), get_prompt('pan.user'),
+                          image_url, max_tokens=MAX_TOKENS['pan'])
+
+
+def _passport_request(image_url: str, fields=None):
+    if fields:
+        return _focused_request(DOCUMENT_NAMES['passport'], fields, image_url, max_tokens=MAX_TOKENS['passport'])
+    return _build_request(get_prompt('passport.system'), get_prompt('passport.user'),
+                          image_url, max_tokens=MAX_TOKENS['passport'])
+
+
+def _classify_request(image_url: str):
+    return _build_request(get_prompt("classify"), "Which document is this?", image_url, max_tokens=5)
+
+
+def _bundle_request(documents):
+    """Request for [(doc_type, image_url), ...] with a schema keyed by doc_type."""
+    schema = json.dumps({doc_type: {field: "" for field in REQUIRED_FIELDS[doc_type]}
+                         for doc_type, _ in documents})
+    content = []
+    for number, (doc_type, image_url) in enumerate(documents, start=1):
+        content.append({"type": "text", "text": f"Image {number}: {DOCUMENT_NAMES[doc_type]} ({doc_type})"})
+        content.append({"type": "image_url", "image_url": {"url": image_url}})
+    max_tokens = sum(MAX_TOKENS[doc_type] for doc_type, _ in documents)
+    return _chat_request(get_prompt("bundle").format(schema=schema), content, max_tokens)
+
+
+class StreamStats:
+    """Counters showing how much output the early stream termination saves."""
+
+    def __init__(self):
+        self.streams = 0
+        self.early_stops = 0
+        self.chunks = 0
+
+    def snapshot(self) -> dict:
+        return {"streams": self.streams, "early_stops": self.early_stops, "chunks": self.chunks}
+
+
+stream_stats = StreamStats()
+
+
+class ModelCallStats:
+    """Model call latency, split by whether the image was sent inline (data URL) or as a remote URL."""
+
+    def __init__(self):
+        self.calls = {}
+        self.seconds = {}
+
+    def record(self, image_url: str, seconds: float):
+        source = "inline" if image_url.startswith("data:") else "remote"
+        self.calls[source] = self.calls.get(source, 0) + 1
+        self.seconds[source] = self.seconds.get(source, 0.0) + seconds
 
-                DO NOT include any additional text or explanation.
-                ONLY return the JSON object with extracted values.
-                """
+    def snapshot(self) -> dict:
+        return {
+            source: {"calls": count, "avg_ms": round(self.seconds[source] * 1000 / count, 1)}
+            for source, count in self.calls.items()
+        }
+
+
+model_call_stats = ModelCallStats()
+
+
+class TokenUsageStats:
+    """Prompt and completion tokens reported by the provider, per task and prompt version."""
+
+    def __init__(self):
+        self.usage = {}  # (task, prompt version) -> [calls, prompt tokens, completion tokens]
+        self.unreported = 0  # Calls without usage, e.g. streams closed early
+
+    def record(self, task: str, usage):
+        if usage is None:
+            self.unreported += 1
+            return
+        totals = self.usage.setdefault((task, PROMPT_VERSION), [0, 0, 0])
+        totals[0] += 1
+        totals[1] += usage.prompt_tokens or 0
+        totals[2] += usage.completion_tokens or 0
+
+    def snapshot(self) -> dict:
+        return {
+            "prompt_version": PROMPT_VERSION,
+            "unreported": self.unreported,
+            "tasks": {
+                f"{task}@v{version}": {
+                    "calls": calls,
+                    "prompt_tokens": prompt,
+                    "completion_tokens": completion,
+                    "avg_prompt_tokens": round(prompt / calls, 1),
+                    "avg_completion_tokens": round(completion / calls, 1),
+                }
+                for (task, version), (calls, prompt, completion) in self.usage.items()
             },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "Extract all key-value pairs from the passport image"
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": image_url
-                        }
-                    }
-                ]
-            }
-        ],
-        max_tokens=500,  # Increased token limit for passport details
-        temperature=0.7,
-        top_p=0.7,
-        top_k=50,
-        repetition_penalty=1,
-        stop=["<|eot_id|>", "<|eom_id|>"],
-        stream=False
-    )
+        }
+
+
+token_usage_stats = TokenUsageStats()
+
+
+async def _stream_completion(request: dict, required, on_partial=None, client=None, task: str = None):
+    """Stream a completion, closing it once a JSON object containing every required field arrives.
+
+    on_partial, if given, is called with the fields parsed so far whenever a new one completes.
+    """
+    stream = await provider_client.create_completion(dict(request, stream=True), client)
+    stream_stats.streams += 1
+    scanner = JSONObjectScanner()
+    parts = []
+    seen = {}
+    usage = None
+    try:
+        async for chunk in stream:
+            # The provider reports usage on the last chunk, which an early stop never sees
+            usage = getattr(chunk, "usage", None) or usage
+            delta = chunk.choices[0].delta if chunk.choices else None
+            if not delta or not delta.content:
+                continue
+            stream_stats.chunks += 1
+            parts.append(delta.content)
+
+            for obj in scanner.feed(delta.content):
+                if all(obj.get(field) for field in required):
+                    stream_stats.early_stops += 1
+                    logger.info("All required fields received, closing stream early")
+                    return "".join(parts)
+
+            if on_partial:
+                fields = scanner.partial_fields()
+                if len(fields) > len(seen):
+                    seen = fields
+                    on_partial(fields)
+    finally:
+        # Closing the generator releases the HTTP response, so the provider stops generating
+        await stream.aclose()
+        token_usage_stats.record(task, usage)
+    return "".join(parts)
+
+
+def _rejects_response_format(error: Exception) -> bool:
+    """Whether a 4xx from the provider is about structured output rather than the rest of the request."""
+    message = str(error).lower()
+    return any(word in message for word in ("response_format", "response format", "schema"))
+
+
+def _request_image_url(request: dict) -> str:
+    return request["messages"][1]["content"][1]["image_url"]["url"]
+
+
+async def _complete(task: str, request: dict, required, stream=None, on_partial=None, schema: dict = None):
+    """Run request on the backend the router picks for task (a doc type, "classify" or "bundle").
+
+    schema, when the backend supports it, constrains the answer to a JSON object of that shape.
+    """
+    streaming = STREAM_TOKENS if stream is None else stream
+
+    async def send(backend, routed):
+        if streaming:
+            return await _stream_completion(routed, required, on_partial, backend.client, task)
+        response = await provider_client.create_completion(routed, backend.client)
+        token_usage_stats.record(task, getattr(response, "usage", None))
+        return response.choices[0].message.content
+
+    async def attempt(backend):
+        routed = dict(request, model=backend.model)
+        if not (schema and backend.structured_output):
+            return await send(backend, routed)
+        try:
+            return await send(backend, dict(routed, response_format={"type": "json_schema", "schema": schema}))
+        except together_error.InvalidRequestError as e:
+            if not _rejects_response_format(e):
+                raise  # A bad image or prompt fails the same way without response_format
+            # Only blame response_format if the same request goes through without it
+            content = await send(backend, routed)
+            logger.warning(f"Backend {backend.name} rejects response_format; using plain JSON prompts")
+            backend.structured_output = False
+            return content
+
+    started = time.perf_counter()
+    content = await backend_router.call(task, attempt)
+    model_call_stats.record(_request_image_url(request), time.perf_counter() - started)
+    return content
+
+
+async def extract_aadhar_details_async(image_url: str, fields=None, stream=None, on_partial=None):
+    """Extract key-value pairs from an Aadhar card image; fields restricts a retry to the missing keys.
+
+    stream (default OCR_STREAM_TOKENS) reads the answer token by token and stops early;
+    on_partial receives the fields parsed so far while streaming.
+    """
+    required = fields or REQUIRED_FIELDS['aadhar']
+    return await _complete('aadhar', _aadhar_request(image_url, fields), required, stream, on_partial,
+                           response_schema('aadhar', fields))
+
+
+async def extract_pan_card_details_async(image_url: str, fields=None, stream=None, on_partial=None):
+    """Extract key-value pairs from a PAN card image."""
+    required = fields or REQUIRED_FIELDS['pan']
+    return await _complete('pan', _pan_request(image_url, fields), required, stream, on_partial,
+                           response_schema('pan', fields))
+
+
+async def extract_passport_details_async(image_url: str, fields=None, stream=None, on_partial=None):
+    """Extract key-value pairs from a passport image."""
+    required = fields or REQUIRED_FIELDS['passport']
+    return await _complete('passport', _passport_request(image_url, fields), required, stream, on_partial,
+                           response_schema('passport', fields))
+
+
+async def classify_document_async(image_url: str):
+    """Ask the model which kind of document image_url shows; returns its raw answer."""
+    return await _complete('classify', _classify_request(image_url), [], stream=False)
+
 
-    # Directly access the response content
-    return response.choices[0].message.content
\ No newline at end of file
+async def extract_bundle_async(documents):
+    """One model call for [(doc_type, image_url), ...]; returns the raw JSON answer keyed by doc_type."""
+    schema = {
+        "type": "object",
+        "properties": {doc_type: response_schema(doc_type, REQUIRED_FIELDS[doc_type]) for doc_type, _ in documents},
+        "required": [doc_type for doc_type, _ in documents],
+    }
+    return await _complete('bundle', _bundle_request(documents), [], stream=False, schema=schema)
@@ -0,0 +1,210 @@
+import os
+import queue
+import asyncio
+import logging
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+
+logger = logging.getLogger(__name__)
+
+# Local OCR holds the GIL for seconds, so it runs in worker processes; 0 keeps it in a thread
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0"))
+OCR_WORKER_MAX_JOBS = int(os.getenv("OCR_WORKER_MAX_JOBS", "200"))  # Recycle a worker after this many jobs
+OCR_WORKER_JOB_TIMEOUT = float(os.getenv("OCR_WORKER_JOB_TIMEOUT", "60"))
+
+
+def _worker_main(job_queue, result_queue, max_jobs: int):
+    """Worker process: load the OCR reader once, then serve jobs until recycled or told to stop."""
+    from services import local_ocr
+    try:
+        local_ocr.get_reader()
+    except Exception as e:
+        result_queue.put(("start_failed", None, f"{type(e).__name__}: {e}", os.getpid()))
+        return
+    result_queue.put(("ready", None, None, os.getpid()))
+
+    reason = "recycled"
+    for _ in range(max_jobs):
+        job = job_queue.get()
+        if job is None:  # Scale-down / shutdown sentinel
+            reason = "stopped"
+            break
+        job_id, shm_name, size = job
+        try:
+            # Spawned workers share the parent's resource tracker, which unlinks the segment
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                lines = local_ocr.read_text(shm.buf[:size])
+            finally:
+                shm.close()
+            result_queue.put(("done", job_id, lines, os.getpid()))
+        except Exception as e:
+            result_queue.put(("error", job_id, f"{type(e).__name__}: {e}", os.getpid()))
+
+    result_queue.put(("exit", None, reason, os.getpid()))
+
+
+class OCRWorkerPool:
+    """Pool of OCR worker processes fed through a job queue.
+
+    Image bytes travel through multiprocessing.shared_memory rather than being pickled; only the
+    segment name goes over the queue. Workers are recycled after max_jobs jobs and the pool can
+    be resized at runtime. Callers just await submit().
+    """
+
+    def __init__(self, size: int = OCR_WORKERS, max_jobs: int = OCR_WORKER_MAX_JOBS):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._jobs = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._target = size
+        self._max_jobs = max_jobs
+        self._workers = {}  # pid -> Process
+        self._ready = set()  # pids that loaded the reader
+        self._pending = {}  # job_id -> (loop, future)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._listener = None
+        self._running = False
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.recycled = 0
+
+    def start(self):
+        self._running = True
+        self._listener = threading.Thread(target=self._listen, name="ocr-pool-results", daemon=True)
+        self._listener.start()
+        self._spawn_missing()
+        logger.info(f"Started OCR worker pool with {self._target} workers")
+
+    def _spawn_missing(self):
+        with self._lock:
+            while self._running and len(self._workers) < self._target:
+                process = self._ctx.Process(target=_worker_main, args=(self._jobs, self._results, self._max_jobs),
+                                            daemon=True)
+                process.start()
+                self._workers[process.pid] = process
+
+    def _reap_dead(self):
+        with self._lock:
+            for pid, process in list(self._workers.items()):
+                if not process.is_alive():
+                    process.join()
+                    del self._workers[pid]
+                    if pid in self._ready:
+                        self._ready.discard(pid)
+                        logger.warning(f"OCR worker {pid} died unexpectedly")
+                    else:
+                        # Respawning a worker that can't even start would just loop
+                        logger.error(f"OCR worker {pid} exited during startup; stopping the pool")
+                        self._target = 0
+
+    def _listen(self):
+        while self._running:
+            try:
+                kind, job_id, payload, pid = self._results.get(timeout=1)
+            except queue.Empty:
+                self._reap_dead()
+                self._spawn_missing()
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind == "exit":
+                with self._lock:
+                    process = self._workers.pop(pid, None)
+                    self._ready.discard(pid)
+                if process is not None:
+                    process.join()
+                    if payload == "recycled":
+                        self.recycled += 1
+                self._spawn_missing()
+                continue
+            if kind == "ready":
+                with self._lock:
+                    self._ready.add(pid)
+                continue
+            if kind == "start_failed":
+                logger.error(f"OCR worker {pid} could not load the OCR reader ({payload}); stopping the pool")
+                with self._lock:
+                    self._target = 0
+                continue
+
+            loop, future = self._pending.pop(job_id, (None, None))
+            if future is None:
+                continue
+            if kind == "done":
+                self.jobs_done += 1
+                loop.call_soon_threadsafe(_set_result, future, payload)
+            else:
+                self.jobs_failed += 1
+                loop.call_soon_threadsafe(_set_exception, future, RuntimeError(payload))
+
+    async def submit(self, data) -> list:
+        """OCR encoded image bytes in a worker and return the text lines."""
+        if not self._running:
+            raise RuntimeError("OCR worker pool is not running")
+        size = len(data)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            shm.buf[:size] = data
+            job_id = next(self._ids)
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[job_id] = (loop, future)
+            self._jobs.put((job_id, shm.name, size))
+            try:
+                return await asyncio.wait_for(future, timeout=OCR_WORKER_JOB_TIMEOUT)
+            finally:
+                self._pending.pop(job_id, None)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def resize(self, size: int):
+        """Grow by spawning workers, or shrink by letting surplus workers exit after their current job."""
+        with self._lock:
+            surplus = len(self._workers) - size
+            self._target = size
+        for _ in range(max(0, surplus)):
+            self._jobs.put(None)
+        self._spawn_missing()
+
+    async def shutdown(self, timeout: float = 10):
+        self.resize(0)
+        with self._lock:
+            workers = list(self._workers.values())
+        for process in workers:
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                process.terminate()
+        self._running = False
+        self._workers.clear()
+
+    @property
+    def active(self) -> bool:
+        return self._running and self._target > 0
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "target": self._target,
+            "in_flight": len(self._pending),
+            "jobs_done": self.jobs_done,
+            "jobs_failed": self.jobs_failed,
+            "recycled": self.recycled,
+        }
+
+
+def _set_result(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+def _set_exception(future, error):
+    if not future.done():
+        future.set_exception(error)
+
+
+ocr_pool = OCRWorkerPool()
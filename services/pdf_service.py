@@ -0,0 +1,70 @@
+import io
+import os
+import logging
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+MAX_PDF_PAGES = int(os.getenv("OCR_MAX_PDF_PAGES", "50"))
+PDF_PAGE_CONCURRENCY = int(os.getenv("OCR_PDF_PAGE_CONCURRENCY", "4"))
+MIN_PAGE_IMAGE_SIDE = 200  # Smaller embedded images are logos, stamps and signatures
+
+# Embedded image encodings the vision model accepts as-is; anything else is re-encoded to PNG
+PASSTHROUGH_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+
+
+def _largest_image_name(page):
+    """Name of the biggest embedded image on the page, read from the XObject headers without decoding"""
+    resources = page.get("/Resources")
+    if resources is None:
+        return None
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return None
+    best_name, best_area = None, 0
+    for name, ref in xobjects.get_object().items():
+        obj = ref.get_object()
+        if obj.get("/Subtype") != "/Image":
+            continue
+        width, height = int(obj.get("/Width", 0)), int(obj.get("/Height", 0))
+        if min(width, height) >= MIN_PAGE_IMAGE_SIDE and width * height > best_area:
+            best_name, best_area = name, width * height
+    return best_name
+
+
+def _page_image(page):
+    """(bytes, mime type) of the page scan, or None if the page has no usable image"""
+    name = _largest_image_name(page)
+    if name is None:
+        return None
+    image_file = page.images[name]
+    mime_type = PASSTHROUGH_TYPES.get(os.path.splitext(image_file.name)[1].lower())
+    if mime_type:
+        return image_file.data, mime_type
+    out = io.BytesIO()
+    image_file.image.convert("RGB").save(out, format="PNG")
+    return out.getvalue(), "image/png"
+
+
+def iter_pdf_pages(data, max_pages: int = MAX_PDF_PAGES):
+    """Yield (page_number, text_layer, image) for each page of an in-memory PDF.
+
+    Pages are parsed one at a time, so only the page being handed out is decoded. image is the
+    page's largest embedded picture as (bytes, mime type), or None for text-only pages.
+    """
+    reader = PdfReader(io.BytesIO(data))
+    for number, page in enumerate(reader.pages, start=1):
+        if number > max_pages:
+            logger.warning(f"PDF has more than {max_pages} pages; ignoring the rest")
+            return
+        try:
+            text = page.extract_text() or ""
+        except Exception as e:
+            logger.warning(f"Could not read the text layer of page {number}: {str(e)}")
+            text = ""
+        try:
+            image = _page_image(page)
+        except Exception as e:
+            logger.warning(f"Could not decode the image on page {number}: {str(e)}")
+            image = None
+        yield number, text, image
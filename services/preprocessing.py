@@ -0,0 +1,80 @@
+import io
+import threading
+import cv2
+import numpy as np
+
+# OCR works best around 300 DPI. Cards are 85.6 mm (3.37 in) wide, so when the file carries
+# no usable DPI the effective resolution is estimated from the image width.
+TARGET_DPI = 300
+CARD_WIDTH_INCHES = 3.37
+MIN_SCALE = 0.5
+MAX_SCALE = 3.0
+MIN_TRUSTED_DPI = 100  # Cameras write 72 DPI regardless of the actual resolution
+
+
+def image_dpi(data):
+    """DPI recorded in the image header, or None. Only the header is parsed."""
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            dpi = img.info.get("dpi")
+    except Exception:
+        return None
+    return float(dpi[0]) if dpi and dpi[0] else None
+
+
+def scale_factor(width: int, dpi: float = None) -> float:
+    """Resize factor that brings the card to roughly TARGET_DPI."""
+    effective_dpi = dpi if dpi and dpi >= MIN_TRUSTED_DPI else width / CARD_WIDTH_INCHES
+    return min(MAX_SCALE, max(MIN_SCALE, TARGET_DPI / effective_dpi))
+
+
+class Preprocessor:
+    """Resize -> median blur -> adaptive threshold, entirely in OpenCV, writing into reused buffers.
+
+    The contrast/sharpness PIL pass of the trial/ prototypes is dropped: after adaptive
+    thresholding the image is already 0/255, and both enhancements leave such images unchanged.
+
+    The returned array is one of the internal buffers and is overwritten by the next call,
+    so use one Preprocessor per thread (see get_preprocessor) and consume the result first.
+    """
+
+    def __init__(self, block_size: int = 31, c: int = 12, median: int = 3):
+        self.block_size = block_size
+        self.c = c
+        self.median = median
+        self._buffers = {}
+
+    def _buffer(self, name: str, shape):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self._buffers[name] = buf
+        return buf
+
+    def run(self, gray: np.ndarray, dpi: float = None) -> np.ndarray:
+        height, width = gray.shape[:2]
+        factor = scale_factor(width, dpi)
+        size = (max(1, round(width * factor)), max(1, round(height * factor)))
+        shape = (size[1], size[0])
+
+        scaled = self._buffer("scaled", shape)
+        blurred = self._buffer("blurred", shape)
+        interpolation = cv2.INTER_CUBIC if factor > 1 else cv2.INTER_AREA
+        cv2.resize(gray, size, dst=scaled, interpolation=interpolation)
+        cv2.medianBlur(scaled, self.median, dst=blurred)
+        cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                              self.block_size, self.c, dst=scaled)
+        return scaled
+
+
+_local = threading.local()
+
+
+def get_preprocessor() -> Preprocessor:
+    """Per-thread Preprocessor, so concurrent OCR threads never share buffers."""
+    preprocessor = getattr(_local, "preprocessor", None)
+    if preprocessor is None:
+        preprocessor = _local.preprocessor = Preprocessor()
+    return preprocessor
+
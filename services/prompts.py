@@ -0,0 +1,181 @@
+import os
+import re
+import logging
+from models.ocr_model import EXTRACTION_MODELS
+
+logger = logging.getLogger(__name__)
+
+# "1" is the original hand-written prompts, "2" the compact ones generated from the schemas
+PROMPT_VERSION = os.getenv("OCR_PROMPT_VERSION", "2")
+
+DOCUMENT_NAMES = {
+    'aadhar': "Aadhar card",
+    'pan': "PAN card",
+    'passport': "passport",
+}
+
+
+def normalize_whitespace(text: str) -> str:
+    """Strip indentation and trailing spaces, drop blank lines; leading spaces are prompt tokens too."""
+    return "\n".join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+def compact(text: str) -> str:
+    """Collapse all whitespace runs to single spaces."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def field_list(doc_type: str) -> str:
+    """'Name (full name as printed), Date_Of_Birth (DD/MM/YYYY), ...' from the response model."""
+    parts = []
+    for name, info in EXTRACTION_MODELS[doc_type].model_fields.items():
+        parts.append(f"{name} ({info.description})" if info.description else name)
+    return ", ".join(parts)
+
+
+LEGACY_SYSTEM_PROMPTS = {
+    'aadhar': """
+                You are an expert data extractor specializing in Aadhar card information.
+                For the given Aadhar card image, STRICTLY extract the following details:
+
+                1. Extract ONLY the exact values for these fields
+                2. Return ONLY a valid JSON format
+                3. Do not add any explanatory text
+
+                Required Fields:
+                - Name: Full name as printed
+                - Date Of Birth: Exact date format DD/MM/YYYY
+                - Gender: M, F, or Other
+                - Aadhar No: Exact 12-digit Aadhar number
+                - Address: Full address as printed
+
+                Output Format (MANDATORY):
+                {
+                  "Name": "",
+                  "Date_Of_Birth": "",
+                  "Gender": "",
+                  "Aadhar_No": "",
+                  "Address": ""
+                }
+
+                DO NOT include any additional text or explanation.
+                ONLY return the JSON object with extracted values.
+                """,
+    'pan': """
+                You are an expert data extractor. For the given PAN card image, STRICTLY extract the following details:
+
+1. Extract ONLY the exact values for these fields
+2. Return ONLY a valid JSON format
+3. Do not add any explanatory text
+
+Required Fields:
+- PAN Card Number: Exact 10-digit alphanumeric code
+- Name: Full name exactly as printed
+- Father's Name: Exact father's name
+- Date of Birth: Exact date printed
+
+Output Format (MANDATORY):
+{
+  "panCardNumber": "",
+  "name": "",
+  "fatherName": "",
+  "dateOfBirth": ""
+}
+DO NOT include any additional text or explanation.
+ONLY return the JSON object with extracted values.
+
+                """,
+    'passport': """
+                You are an expert data extractor specializing in passport information.
+                For the given passport image, STRICTLY extract the following details:
+
+                1. Extract ONLY the exact values for these fields
+                2. Return ONLY a valid JSON format
+                3. Do not add any explanatory text
+
+                Required Fields:
+                - Passport Number: Exact alphanumeric passport number
+                - Surname: Exact surname as printed
+                - Given Name: Full given name(s)
+                - Nationality: Exact nationality
+                - Sex: M or F
+                - Date of Birth: Exact date format DD/MM/YYYY
+                - Place of Birth: Exact location
+                - Date of Issue: Exact date format DD/MM/YYYY
+                - Date of Expiry: Exact date format DD/MM/YYYY
+                - Place of Issue: Exact location
+
+                Output Format (MANDATORY):
+                {
+                  "Passport_No": "",
+                  "Surname": "",
+                  "Given_Name": "",
+                  "Full_Name": "",
+                  "Nationality": "",
+                  "Sex": "",
+                  "Date_of_Birth": "",
+                  "Place_of_Birth": "",
+                  "Date_of_Issue": "",
+                  "Date_of_Expiry": "",
+                  "Place_of_Issue": ""
+                }
+
+                DO NOT include any additional text or explanation.
+                ONLY return the JSON object with extracted values.
+                """,
+}
+LEGACY_USER_PROMPTS = {
+    'aadhar': "Extract required key-value pairs from the Aadhar card image",
+    'pan': "Extract important key-value pairs from it",
+    'passport': "Extract all key-value pairs from the passport image",
+}
+
+# One template for every document type; the field list and its hints come from the schema
+EXTRACTION_PROMPT = (
+    "Extract from the {document} image: {fields}. "
+    "Return ONLY a JSON object with exactly these keys and the values as printed, no other text."
+)
+# Retry prompts only ask for what is still missing
+FOCUSED_PROMPT = (
+    "You are an expert data extractor for {document} images. "
+    "Return ONLY a valid JSON object with exactly these keys: {fields}. "
+    "Use the exact values printed on the document. Do not add any explanatory text."
+)
+# Classification only needs a one-word answer
+CLASSIFY_PROMPT = (
+    "You classify Indian identity document images. "
+    "Answer with exactly one word: aadhar, pan, passport or unknown."
+)
+# Several documents of one customer in a single call: one short shared prompt instead of one
+# long system prompt per document, and one round trip
+BUNDLE_PROMPT = (
+    "You are an expert data extractor for Indian identity documents. "
+    "Each image below is preceded by the type of document it shows. "
+    "Return ONLY one valid JSON object with exactly this structure, using the values exactly as printed "
+    "(dates as DD/MM/YYYY, Aadhar number as 12 digits):\n{schema}\n"
+    "Do not add any explanatory text."
+)
+
+
+def _build_registry() -> dict:
+    """{version: {prompt name: text}}, whitespace-normalized once at import."""
+    shared = {"focused": FOCUSED_PROMPT, "classify": CLASSIFY_PROMPT, "bundle": BUNDLE_PROMPT}
+    registry = {"1": dict(shared), "2": dict(shared)}
+    for doc_type, document in DOCUMENT_NAMES.items():
+        registry["1"][f"{doc_type}.system"] = normalize_whitespace(LEGACY_SYSTEM_PROMPTS[doc_type])
+        registry["1"][f"{doc_type}.user"] = LEGACY_USER_PROMPTS[doc_type]
+        registry["2"][f"{doc_type}.system"] = compact(
+            EXTRACTION_PROMPT.format(document=document, fields=field_list(doc_type)))
+        registry["2"][f"{doc_type}.user"] = f"The {document} image:"
+    return registry
+
+
+PROMPTS = _build_registry()
+
+if PROMPT_VERSION not in PROMPTS:
+    logger.warning(f"Unknown OCR_PROMPT_VERSION {PROMPT_VERSION!r}; using 2")
+    PROMPT_VERSION = "2"
+
+
+def get_prompt(name: str, version: str = None) -> str:
+    return PROMPTS[version or PROMPT_VERSION][name]
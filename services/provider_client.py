@@ -0,0 +1,174 @@
+import os
+import time
+import logging
+import aiohttp
+import together
+from together import AsyncTogether
+from dotenv import load_dotenv
+from services.rate_limiter import provider_limiter
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+PROVIDER_MAX_CONNECTIONS = int(os.getenv("OCR_PROVIDER_MAX_CONNECTIONS", "32"))
+PROVIDER_KEEPALIVE_SECONDS = float(os.getenv("OCR_PROVIDER_KEEPALIVE_SECONDS", "60"))
+PROVIDER_CONNECT_TIMEOUT = float(os.getenv("OCR_PROVIDER_CONNECT_TIMEOUT", "10"))
+# Non-streamed answers arrive in one piece, so the read timeout must cover the whole generation
+PROVIDER_READ_TIMEOUT = float(os.getenv("OCR_PROVIDER_READ_TIMEOUT", "60"))
+PROVIDER_TOTAL_TIMEOUT = float(os.getenv("OCR_PROVIDER_TOTAL_TIMEOUT", "120"))
+IMAGE_TOKEN_ESTIMATE = int(os.getenv("OCR_PROVIDER_IMAGE_TOKENS", "1600"))  # Prompt tokens per image, for the TPM budget
+
+async_client = AsyncTogether(api_key=os.getenv("TOGETHER_API_KEY"), timeout=PROVIDER_TOTAL_TIMEOUT)
+
+
+class _TimeoutSession:
+    """What the Together SDK sees as its aiohttp session.
+
+    The SDK passes ClientTimeout(total=...) on every request, which would replace the session's
+    per-phase timeouts; this forwards to the shared session with ours instead.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, timeout: aiohttp.ClientTimeout):
+        self._session = session
+        self._timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs["timeout"] = self._timeout
+        return self._session.request(method, url, **kwargs)
+
+
+class ProviderClient:
+    """Owns the pooled, keep-alive HTTP session used for every async provider call.
+
+    Without a shared session the SDK opens a new aiohttp session (and TLS connection) per request.
+    Calls go through the rate limiter first. aiohttp speaks HTTP/1.1 only, so concurrency comes
+    from the connection pool rather than HTTP/2 multiplexing.
+    """
+
+    def __init__(self, max_connections: int = PROVIDER_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(total=PROVIDER_TOTAL_TIMEOUT, sock_connect=PROVIDER_CONNECT_TIMEOUT,
+                                             sock_read=PROVIDER_READ_TIMEOUT)
+        self._session = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.pool_waits = 0
+        self.pool_wait_seconds = 0.0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_queued_start(session, context, params):
+            context.queued_at = time.monotonic()
+
+        async def on_queued_end(session, context, params):
+            # Every pooled connection was busy: the request waited for one to free up
+            self.pool_waits += 1
+            self.pool_wait_seconds += time.monotonic() - context.queued_at
+
+        async def on_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_reuse(session, context, params):
+            self.connections_reused += 1
+
+        trace.on_connection_queued_start.append(on_queued_start)
+        trace.on_connection_queued_end.append(on_queued_end)
+        trace.on_connection_create_end.append(on_create_end)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session, created on first use inside the running event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections,
+                                             keepalive_timeout=PROVIDER_KEEPALIVE_SECONDS, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                                  trace_configs=[self._trace_config()])
+        return self._session
+
+    async def start(self):
+        self.session()
+        logger.info(f"Provider session ready ({self.max_connections} connections)")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def create_completion(self, request: dict, client: AsyncTogether = None):
+        """chat.completions.create through the rate limiter and the pooled session.
+
+        Streamed responses hold their connection (and concurrency slot) until the returned
+        generator is closed. client selects another endpoint; the default is the Together API.
+        """
+        estimate = estimate_tokens(request)
+        lease = await provider_limiter.acquire(estimate)
+
+        # The SDK reads the session from this context variable; set it for this call only
+        context_token = together.aiosession.set(_TimeoutSession(self.session(), self.timeout))
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await (client or async_client).chat.completions.create(**request)
+        except BaseException:
+            self.in_flight -= 1
+            provider_limiter.release(lease)
+            raise
+        finally:
+            together.aiosession.reset(context_token)
+
+        if request.get("stream"):
+            return self._track_stream(response, lease)
+        self.in_flight -= 1
+        provider_limiter.release(lease)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            provider_limiter.settle(estimate, usage.total_tokens)
+        return response
+
+    async def _track_stream(self, stream, lease):
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+            self.in_flight -= 1
+            provider_limiter.release(lease)
+
+    def stats(self) -> dict:
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "saturation": round(self.in_flight / self.max_connections, 4),
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "pool_waits": self.pool_waits,
+            "avg_pool_wait_ms": round(self.pool_wait_seconds * 1000 / self.pool_waits, 2) if self.pool_waits else 0.0,
+        }
+
+
+def estimate_tokens(request: dict) -> int:
+    """Rough prompt + completion token count of a request, charged against the TPM budget up front."""
+    chars = 0
+    images = 0
+    for message in request["messages"]:
+        content = message["content"]
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content:
+            if part["type"] == "image_url":
+                images += 1
+            else:
+                chars += len(part.get("text", ""))
+    return chars // 4 + images * IMAGE_TOKEN_ESTIMATE + request.get("max_tokens", 0)
+
+
+provider_client = ProviderClient()
@@ -0,0 +1,344 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Provider budgets; 0 disables the corresponding limit
+PROVIDER_RPM = float(os.getenv("OCR_PROVIDER_RPM", "0"))
+PROVIDER_TPM = float(os.getenv("OCR_PROVIDER_TPM", "0"))
+PROVIDER_MAX_CONCURRENCY = int(os.getenv("OCR_PROVIDER_MAX_CONCURRENCY", "0"))
+# Requests allowed to wait for budget at once, and how long each may wait before giving up
+ADMISSION_QUEUE_SIZE = int(os.getenv("OCR_ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("OCR_ADMISSION_MAX_WAIT_SECONDS", "10"))
+# SQLite file shared by every worker process on the host; unset keeps the budget per process
+RATE_LIMIT_DB_PATH = os.getenv("OCR_RATE_LIMIT_DB_PATH")
+
+SLOT_POLL_SECONDS = 0.05  # How often to look for a free concurrency slot
+LEASE_TTL_SECONDS = 300  # Shared slots of crashed processes are reclaimed after this (> any provider call)
+
+
+class ProviderBusy(Exception):
+    """The request was not admitted: the queue is full or the wait ran past its deadline."""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most one minute of budget."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (requests larger than the bucket wait for a full one)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        """Return unused budget (negative amounts charge extra and may leave the bucket in debt)."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LocalBudget:
+    """Request, token and concurrency budget of this process alone."""
+
+    mode = "local"
+    blocking = False  # Plain in-memory arithmetic, safe to call on the event loop
+
+    def __init__(self, rpm: float, tpm: float, max_concurrency: int):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+
+    def wait_time(self, tokens: float) -> float:
+        wait = max(self.requests.wait_time(1) if self.requests else 0.0,
+                   self.tokens.wait_time(tokens) if self.tokens else 0.0)
+        if self.max_concurrency and self.in_flight >= self.max_concurrency:
+            wait = max(wait, SLOT_POLL_SECONDS)
+        return wait
+
+    def try_acquire(self, tokens: float):
+        """Take budget for one request. Returns (lease, 0) on success, else (None, seconds to wait)."""
+        wait = self.wait_time(tokens)
+        if wait > 0:
+            return None, wait
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(tokens)
+        self.in_flight += 1
+        return True, 0.0
+
+    def release(self, lease):
+        self.in_flight -= 1
+
+    def settle(self, delta: float):
+        if self.tokens:
+            self.tokens.give_back(delta)
+
+    def snapshot(self) -> dict:
+        return {
+            "mode": self.mode,
+            "in_flight": self.in_flight,
+            "requests_available": round(self.requests.level, 2) if self.requests else None,
+            "tokens_available": round(self.tokens.level) if self.tokens else None,
+        }
+
+
+class SharedBudget:
+    """The same budget kept in a SQLite file, so all uvicorn workers on a host draw from one quota.
+
+    Each check-and-take runs in a BEGIN IMMEDIATE transaction, which serialises the processes.
+    Concurrency slots are rows in a lease table; rows left behind by a crashed process expire.
+    Every method may wait up to the busy timeout for another process's transaction, so
+    ProviderLimiter runs them in worker threads, never on the event loop.
+    """
+
+    mode = "shared"
+    blocking = True
+
+    def __init__(self, db_path: str, rpm: float, tpm: float, max_concurrency: int):
+        self.capacity = {name: per_minute for name, per_minute in (("requests", rpm), ("tokens", tpm))
+                         if per_minute > 0}
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS leases (id INTEGER PRIMARY KEY, expires_at REAL)")
+        for name, per_minute in self.capacity.items():
+            self._db.execute("INSERT OR IGNORE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                             (name, per_minute, time.time()))
+
+    def _levels(self, now: float) -> dict:
+        """Current bucket levels, refilled up to now."""
+        levels = {}
+        for name, level, updated in self._db.execute("SELECT name, level, updated FROM buckets"):
+            if name in self.capacity:
+                rate = self.capacity[name] / 60
+                levels[name] = min(self.capacity[name], level + max(0.0, now - updated) * rate)
+        return levels
+
+    def _wait(self, levels: dict, tokens: float, now: float) -> float:
+        wait = 0.0
+        for name, amount in (("requests", 1), ("tokens", tokens)):
+            if name in levels:
+                amount = min(amount, self.capacity[name])
+                if levels[name] < amount:
+                    wait = max(wait, (amount - levels[name]) / (self.capacity[name] / 60))
+        if self.max_concurrency:
+            self._db.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+            in_flight = self._db.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+            if in_flight >= self.max_concurrency:
+                wait = max(wait, SLOT_POLL_SECONDS)
+        return wait
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(time.time())
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def wait_time(self, tokens: float) -> float:
+        return self._transaction(lambda now: self._wait(self._levels(now), tokens, now))
+
+    def try_acquire(self, tokens: float):
+        def acquire(now):
+            levels = self._levels(now)
+            wait = self._wait(levels, tokens, now)
+            if wait > 0:
+                return None, wait
+            for name, amount in (("requests", 1), ("tokens", tokens)):
+                if name in levels:
+                    self._db.execute("UPDATE buckets SET level = ?, updated = ? WHERE name = ?",
+                                     (levels[name] - min(amount, self.capacity[name]), now, name))
+            lease = self._db.execute("INSERT INTO leases (expires_at) VALUES (?)",
+                                     (now + LEASE_TTL_SECONDS,)).lastrowid
+            return lease, 0.0
+        return self._transaction(acquire)
+
+    def release(self, lease):
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE id = ?", (lease,))
+
+    def settle(self, delta: float):
+        def give_back(now):
+            levels = self._levels(now)
+            if "tokens" in levels:
+                self._db.execute("UPDATE buckets SET level = ?, updated = ? WHERE name = 'tokens'",
+                                 (min(self.capacity["tokens"], levels["tokens"] + delta), now))
+        self._transaction(give_back)
+
+    def snapshot(self) -> dict:
+        def read(now):
+            levels = self._levels(now)
+            in_flight = self._db.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+            return levels, in_flight
+        levels, in_flight = self._transaction(read)
+        return {
+            "mode": self.mode,
+            "in_flight": in_flight,
+            "requests_available": round(levels["requests"], 2) if "requests" in levels else None,
+            "tokens_available": round(levels["tokens"]) if "tokens" in levels else None,
+        }
+
+
+class ProviderLimiter:
+    """Requests-per-minute, tokens-per-minute and concurrency limits in front of the vision provider.
+
+    Callers queue FIFO for budget. At most queue_size callers wait at a time; the next one is
+    refused immediately with ProviderBusy, as is any caller that waits longer than max_wait.
+    With db_path the budget is shared by every process using the same file.
+    """
+
+    def __init__(self, rpm: float = PROVIDER_RPM, tpm: float = PROVIDER_TPM,
+                 max_concurrency: int = PROVIDER_MAX_CONCURRENCY, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 max_wait: float = ADMISSION_MAX_WAIT_SECONDS, db_path: str = RATE_LIMIT_DB_PATH):
+        self.enabled = rpm > 0 or tpm > 0 or max_concurrency > 0
+        self.rpm = rpm or None
+        self.tpm = tpm or None
+        self.max_concurrency = max_concurrency or None
+        self.budget = None
+        if self.enabled:
+            self.budget = (SharedBudget(db_path, rpm, tpm, max_concurrency) if db_path
+                           else LocalBudget(rpm, tpm, max_concurrency))
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self._lock = None  # Created on first use, inside the running event loop
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seen = 0.0
+
+    async def acquire(self, tokens: float):
+        """Wait for budget for one request of about `tokens` tokens, or raise ProviderBusy.
+
+        Returns a lease to hand back to release() when the request is finished.
+        """
+        if not self.enabled:
+            self.admitted += 1
+            return None
+        if self.waiting >= self.queue_size:
+            self.rejected += 1
+            raise ProviderBusy("Provider request queue is full",
+                               retry_after=await self._call(self.budget.wait_time, tokens))
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(self.max_wait):
+                # Only the head of the queue polls the budget; the lock hands over in FIFO order
+                async with self._lock:
+                    lease, delay = await self._try_acquire(tokens)
+                    while lease is None:
+                        await asyncio.sleep(delay)
+                        lease, delay = await self._try_acquire(tokens)
+        except TimeoutError:
+            self.timed_out += 1
+            raise ProviderBusy(f"No provider capacity within {self.max_wait:g}s",
+                               retry_after=await self._call(self.budget.wait_time, tokens))
+        finally:
+            self.waiting -= 1
+            waited = time.monotonic() - started
+            self.wait_seconds += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+        self.admitted += 1
+        return lease
+
+    async def _call(self, fn, *args):
+        """Run a budget method, in a worker thread if it can block."""
+        if not self.budget.blocking:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def _try_acquire(self, tokens: float):
+        if not self.budget.blocking:
+            return self.budget.try_acquire(tokens)
+        attempt = asyncio.ensure_future(asyncio.to_thread(self.budget.try_acquire, tokens))
+        try:
+            return await asyncio.shield(attempt)
+        except asyncio.CancelledError:
+            # The thread runs to completion regardless; give back a slot it takes after we stopped waiting
+            attempt.add_done_callback(self._release_abandoned)
+            raise
+
+    def _release_abandoned(self, attempt):
+        if not attempt.cancelled() and attempt.exception() is None:
+            self.release(attempt.result()[0])
+
+    def _in_background(self, fn, *args):
+        """Run a budget update without waiting for it (in a worker thread if it can block)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or not self.budget.blocking:
+            fn(*args)
+            return
+        loop.run_in_executor(None, fn, *args).add_done_callback(_log_budget_error)
+
+    def release(self, lease):
+        if lease is not None:
+            self._in_background(self.budget.release, lease)
+
+    def settle(self, estimated: float, actual: float):
+        """Correct the token budget once the provider reports the real usage."""
+        if self.budget is not None and self.tpm and actual:
+            self._in_background(self.budget.settle, estimated - actual)
+
+    async def stats(self) -> dict:
+        waits = self.admitted + self.timed_out
+        stats = {
+            "enabled": self.enabled,
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.waiting,
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self.wait_seconds * 1000 / waits, 2) if waits else 0.0,
+            "max_wait_ms": round(self.max_wait_seen * 1000, 2),
+        }
+        if self.budget is not None:
+            stats["budget"] = await self._call(self.budget.snapshot)
+        return stats
+
+
+def _log_budget_error(future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"Shared budget update failed: {str(future.exception())}")
+
+
+provider_limiter = ProviderLimiter()
@@ -0,0 +1,127 @@
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+
+import httpx
+from fastapi import HTTPException
+from together import error as together_error
+
+RETRY_BASE_DELAY = float(os.getenv("OCR_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("OCR_RETRY_MAX_DELAY", "8"))
+REQUEST_DEADLINE_SECONDS = float(os.getenv("OCR_REQUEST_DEADLINE_SECONDS", "60"))
+
+# Provider errors that are worth another attempt; anything else is treated as permanent
+TRANSIENT_ERRORS = (
+    together_error.RateLimitError,
+    together_error.ServiceUnavailableError,
+    together_error.Timeout,
+    together_error.APIConnectionError,
+    asyncio.TimeoutError,
+    httpx.TransportError,
+    ConnectionError,
+)
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """Decides whether and when to retry: exponential backoff with full jitter,
+    transient-only retries, Retry-After support and an overall deadline."""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY, multiplier: float = 2.0,
+                 deadline: float = REQUEST_DEADLINE_SECONDS):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.deadline = deadline
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        if isinstance(error, HTTPException):
+            return error.status_code in TRANSIENT_STATUS_CODES
+        status = getattr(error, "http_status", None)
+        if status is None and isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+        return status in TRANSIENT_STATUS_CODES
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given zero-based attempt."""
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** attempt))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def retry_after(error: Exception):
+        """Seconds requested by a Retry-After header on the error, if any."""
+        headers = getattr(error, "headers", None)
+        if headers is None and isinstance(error, httpx.HTTPStatusError):
+            headers = error.response.headers
+        if not headers or not hasattr(headers, "items"):
+            return None
+        value = next((v for k, v in headers.items() if str(k).lower() == "retry-after"), None)
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def remaining(self, started_at: float):
+        """Seconds left before the deadline, or None when no deadline is set."""
+        if not self.deadline:
+            return None
+        return max(0.0, self.deadline - (time.monotonic() - started_at))
+
+    def next_delay(self, attempt: int, started_at: float, error: Exception = None):
+        """Seconds to wait before retrying after the given zero-based attempt, or None to give up.
+
+        error is None when the attempt succeeded but returned incomplete fields.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if error is not None and not self.is_retryable(error):
+            return None
+
+        delay = self.retry_after(error) if error is not None else None
+        if delay is None:
+            delay = self.backoff(attempt)
+
+        remaining = self.remaining(started_at)
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+
+class AttemptStats:
+    """Model attempts per document and how many documents needed a retry."""
+
+    def __init__(self):
+        self.documents = 0
+        self.attempts = 0
+        self.retried = 0  # Documents that needed more than one attempt
+        self.outcomes = {}  # complete / partial / failed -> count
+
+    def record(self, attempts: int, outcome: str):
+        self.documents += 1
+        self.attempts += attempts
+        if attempts > 1:
+            self.retried += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def snapshot(self) -> dict:
+        return {
+            "documents": self.documents,
+            "mean_attempts": round(self.attempts / self.documents, 3) if self.documents else 0.0,
+            "retry_rate": round(self.retried / self.documents, 4) if self.documents else 0.0,
+            "outcomes": dict(self.outcomes),
+        }
+
+
+attempt_stats = AttemptStats()
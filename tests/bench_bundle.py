@@ -0,0 +1,104 @@
+"""One bundle call against three separate calls for a customer's Aadhar, PAN and passport.
+
+    python tests/bench_bundle.py
+
+Runs against tests/fakes.FakeProvider with a latency model of a hosted vision model: a fixed
+overhead per request, prefill time per prompt token (every image counts as IMAGE_TOKENS) and
+decode time per output token. Prompt tokens are estimated from the messages the fake received
+(the response_format schema constrains decoding and is not counted).
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The services build their provider clients at import time; this only talks to the local fake
+os.environ.setdefault("TOGETHER_API_KEY", "bench-key")
+
+from fakes import FakeProvider, AADHAR_ANSWER  # noqa: E402
+from services import ocr_service  # noqa: E402
+from services.backends import Backend, BackendRouter  # noqa: E402
+from services.extractors import llm_extractor  # noqa: E402
+
+OVERHEAD_SECONDS = 0.25
+PREFILL_SECONDS_PER_TOKEN = 0.0002
+DECODE_SECONDS_PER_TOKEN = 0.01
+IMAGE_TOKENS = 1600
+CHARS_PER_TOKEN = 4
+
+ANSWERS = {
+    "aadhar": AADHAR_ANSWER,
+    "pan": {"panCardNumber": "ABCDE1234F", "name": "RAVI KUMAR", "fatherName": "SURESH KUMAR",
+            "dateOfBirth": "01/01/1990"},
+    "passport": {"Passport_No": "J8369854", "Surname": "KUMAR", "Given_Name": "RAVI", "Nationality": "INDIAN",
+                 "Sex": "M", "Date_of_Birth": "01/01/1990", "Place_of_Birth": "PUNE",
+                 "Date_of_Issue": "01/01/2020", "Date_of_Expiry": "31/12/2029", "Place_of_Issue": "PUNE"},
+}
+DOCUMENTS = [(doc_type, f"https://example.com/customer/{doc_type}.jpg") for doc_type in ANSWERS]
+
+
+def _bundled_types(body: dict) -> list:
+    """Doc types of a bundle request, from the label before each image; empty for a single document."""
+    return [item["text"].rsplit("(", 1)[1].rstrip(")") for item in body["messages"][1]["content"]
+            if item["type"] == "text" and item["text"].startswith("Image ")]
+
+
+def answer(body: dict) -> dict:
+    bundled = _bundled_types(body)
+    if bundled:
+        return {doc_type: ANSWERS[doc_type] for doc_type in bundled}
+    system = body["messages"][0]["content"]
+    return ANSWERS["pan" if "panCardNumber" in system else "passport" if "Passport_No" in system else "aadhar"]
+
+
+def prompt_tokens(body: dict) -> int:
+    text = [body["messages"][0]["content"]]
+    images = 0
+    for item in body["messages"][1]["content"]:
+        if item["type"] == "text":
+            text.append(item["text"])
+        else:
+            images += 1
+    return sum(len(t) for t in text) // CHARS_PER_TOKEN + images * IMAGE_TOKENS
+
+
+def latency(body: dict) -> float:
+    output_tokens = len(json.dumps(answer(body))) // CHARS_PER_TOKEN
+    return (OVERHEAD_SECONDS + prompt_tokens(body) * PREFILL_SECONDS_PER_TOKEN
+            + output_tokens * DECODE_SECONDS_PER_TOKEN)
+
+
+async def sequential():
+    return {doc_type: await llm_extractor.extract(url, doc_type, stream=False) for doc_type, url in DOCUMENTS}
+
+
+async def concurrent():
+    results = await asyncio.gather(*(llm_extractor.extract(url, doc_type, stream=False)
+                                     for doc_type, url in DOCUMENTS))
+    return {doc_type: result for (doc_type, _), result in zip(DOCUMENTS, results)}
+
+
+async def bundle():
+    return await llm_extractor.extract_bundle(DOCUMENTS)
+
+
+async def main():
+    async with FakeProvider(answer=answer) as fake:
+        fake.configure("fake", delay=latency)
+        ocr_service.backend_router = BackendRouter([Backend("fake", "fake-model", base_url=fake.url("fake"))], {})
+        print(f"{'mode':>22} {'ms':>7} {'calls':>6} {'prompt tokens':>14}")
+        for name, run in (("3 sequential calls", sequential), ("3 concurrent calls", concurrent),
+                          ("bundle", bundle)):
+            fake.requests.clear()
+            started = time.perf_counter()
+            results = await run()
+            elapsed = time.perf_counter() - started
+            assert all(results[doc_type] for doc_type in ANSWERS), results
+            tokens = sum(prompt_tokens(body) for _, body in fake.requests)
+            print(f"{name:>22} {elapsed * 1000:7.0f} {len(fake.requests):6d} {tokens:14d}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
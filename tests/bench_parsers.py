@@ -0,0 +1,38 @@
+"""Parse time of the table-driven parsers against the original hand-written ones.
+
+    python tests/bench_parsers.py
+
+Results are checked for equality by tests/test_parsers.py on the same corpus.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser_corpus import corpus, LEGACY_PARSERS  # noqa: E402
+from utils.parsers import DOCUMENT_PARSERS  # noqa: E402
+
+
+def per_call_us(fn, texts, repeat: int = 5) -> float:
+    best = min(timeit.repeat(lambda: [fn(text) for text in texts], number=1, repeat=repeat))
+    return best * 1e6 / len(texts)
+
+
+def main():
+    texts = corpus()
+    print(f"{'doc type':>10} {'original':>10} {'current':>10}  (us per answer, {len(texts['aadhar'])} answers)")
+    for doc_type in sorted(DOCUMENT_PARSERS):
+        old = per_call_us(LEGACY_PARSERS[doc_type], texts[doc_type])
+        new = per_call_us(DOCUMENT_PARSERS[doc_type], texts[doc_type])
+        print(f"{doc_type:>10} {old:10.1f} {new:10.1f}")
+
+    # Worst case for the Address value pattern: a long whitespace run inside one line
+    worst = ["Address: a" + " " * 8000 + "b"]
+    old = per_call_us(LEGACY_PARSERS['aadhar'], worst, repeat=3) / 1000
+    new = per_call_us(DOCUMENT_PARSERS['aadhar'], worst, repeat=3) / 1000
+    print(f"{'8000-char line':>10}: original {old:.1f} ms, current {new:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Per-image time and peak memory (RSS) of the local OCR preprocessing on synthetic card images.
+
+    python tests/bench_preprocessing.py
+
+"legacy" is the trial/ prototype pipeline (fixed 2x upscale, PIL contrast/sharpness round trip).
+"buffered 2x" runs services.preprocessing at the same 2x scale, so the two rows compare the
+pipelines alone; "buffered dpi" is what the service does, with the scale chosen from the DPI.
+"""
+import os
+import sys
+import time
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+from services.preprocessing import Preprocessor, TARGET_DPI  # noqa: E402
+
+
+def synthetic_card(width: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    height = int(width * 0.63)
+    img = np.full((height, width), 200, dtype=np.uint8)
+    scale = width / 1000
+    for i in range(12):
+        cv2.putText(img, f"NAME RAHUL KUMAR {1234 + i} 5678 9012", (int(40 * scale), int((40 + i * 48) * scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, scale, 30, max(1, int(2 * scale)))
+    noise = rng.integers(-20, 20, img.shape, dtype=np.int16)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def legacy_preprocess(img: np.ndarray) -> np.ndarray:
+    """trial/trial1.py ImagePreprocessor.preprocess"""
+    from PIL import Image, ImageEnhance
+    img = cv2.resize(img, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    img = cv2.medianBlur(img, 3)
+    img = cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 12)
+    pil_img = Image.fromarray(img)
+    pil_img = ImageEnhance.Contrast(pil_img).enhance(2.0)
+    pil_img = ImageEnhance.Sharpness(pil_img).enhance(2.5)
+    return np.array(pil_img)
+
+
+PIPELINES = {
+    "legacy": lambda preprocessor: legacy_preprocess,
+    "buffered 2x": lambda preprocessor: lambda card: preprocessor.run(card, dpi=TARGET_DPI / 2),
+    "buffered dpi": lambda preprocessor: preprocessor.run,
+}
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def bench(name: str):
+    """Time one pipeline and report how far it raises this process's peak RSS.
+
+    tracemalloc cannot see OpenCV's own allocations, so each pipeline runs in a fresh process
+    and the peak resident set size is compared before and after.
+    """
+    cards = [synthetic_card(width, seed) for seed, width in enumerate((640, 1000, 1600, 3000) * 5)]
+    fn = PIPELINES[name](Preprocessor())
+    baseline = peak_rss_mib()
+    fn(cards[0])  # warm up
+    started = time.perf_counter()
+    for card in cards:
+        fn(card)
+    elapsed = time.perf_counter() - started
+    peak = peak_rss_mib()
+    print(f"{name:>13}: {elapsed * 1000 / len(cards):7.2f} ms/image, peak RSS {peak:7.1f} MiB "
+          f"(+{peak - baseline:.1f} MiB over the loaded cards)", flush=True)
+
+
+def main():
+    if len(sys.argv) > 1:
+        bench(sys.argv[1])
+        return
+    for name in PIPELINES:
+        subprocess.run([sys.executable, __file__, name], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Retry rate and mean attempts per document with plain JSON prompts against a JSON schema.
+
+    python tests/bench_retries.py [documents]
+
+Replays tests/replay_corpus.py through process_document_controller and the fake provider, once
+with structured output off and once with it on, and prints the "attempts" counters /stats reports.
+The mix of answer styles is synthetic: the numbers show the mechanism, not production rates.
+"""
+import os
+import sys
+import uuid
+import asyncio
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The services build their provider clients at import time; this only talks to the local fake
+os.environ.setdefault("TOGETHER_API_KEY", "bench-key")
+
+import replay_corpus  # noqa: E402
+from fakes import FakeProvider  # noqa: E402
+from controllers import ocr_controller  # noqa: E402
+from services import ocr_service  # noqa: E402
+from services.backends import Backend, BackendRouter  # noqa: E402
+from services.retry_policy import RetryPolicy, AttemptStats  # noqa: E402
+
+CONCURRENCY = 32
+
+
+async def replay(fake, docs, structured: bool) -> dict:
+    run = uuid.uuid4().hex  # Fresh URLs, so the result cache never answers
+    by_url = {f"https://replay.example/{run}/{doc[0]}.jpg": doc for doc in docs}
+    attempts = {}
+
+    def answer(body):
+        document = by_url[body["messages"][1]["content"][1]["image_url"]["url"]]
+        if body.get("max_tokens", 0) <= 5:
+            return document[1]  # Classification
+        attempt = attempts[document[0]] = attempts.get(document[0], -1) + 1
+        return replay_corpus.answer(document, attempt, body, structured)
+
+    fake.answer = answer
+    fake.requests.clear()
+    ocr_service.backend_router = BackendRouter(
+        [Backend("fake", "fake-model", base_url=fake.url("fake"), structured_output=structured)], {})
+    stats = ocr_controller.attempt_stats = AttemptStats()
+    policy = RetryPolicy(max_retries=3, base_delay=0.001)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(url, doc_type):
+        async with semaphore:
+            await ocr_controller.process_document_controller(url, doc_type, retry_policy=policy, hedge=False)
+
+    await asyncio.gather(*(one(url, doc[1]) for url, doc in by_url.items()), return_exceptions=True)
+    return dict(stats.snapshot(), provider_calls=len(fake.requests))
+
+
+async def main(size: int):
+    docs = replay_corpus.documents(size)
+    async with FakeProvider() as fake:
+        plain = await replay(fake, docs, structured=False)
+        schema = await replay(fake, docs, structured=True)
+    print(f"{f'{size} documents':>25} {'plain prompts':>14} {'json_schema':>12}")
+    for label, key in (("mean attempts", "mean_attempts"), ("retry rate", "retry_rate"),
+                       ("provider calls", "provider_calls")):
+        print(f"{label:>25} {plain[key]:14} {schema[key]:12}")
+    for outcome in ("partial", "failed"):
+        print(f"{outcome + ' results':>25} {plain['outcomes'].get(outcome, 0):14} "
+              f"{schema['outcomes'].get(outcome, 0):12}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.ERROR)  # Partial and failed documents are counted, not logged
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 600))
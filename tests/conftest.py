@@ -0,0 +1,4 @@
+import os
+
+# The services build their provider clients at import time; tests only ever talk to local fakes
+os.environ.setdefault("TOGETHER_API_KEY", "test-key")
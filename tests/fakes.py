@@ -0,0 +1,126 @@
+"""Local stand-ins used by the tests: a fake Together chat completions server."""
+import json
+import asyncio
+from aiohttp import web
+from services.provider_client import provider_client
+from services.image_service import close_http_client
+
+STREAM_CHUNK = 8
+STREAM_TRAILER = "\n\nThese are all the fields I could read from the card. " * 4
+AADHAR_ANSWER = {"Name": "Ravi Kumar", "Date_Of_Birth": "01/01/1990", "Gender": "M",
+                 "Aadhar_No": "1234 5678 9012", "Address": "12 MG Road, Pune"}
+
+
+class FakeProvider:
+    """OpenAI-style /chat/completions server on 127.0.0.1 with one URL prefix per backend.
+
+    Backend behaviour is set per name with configure(): delay (seconds before answering, or a
+    function of the request body returning them), hang (never answer), status and message (answer
+    with that error instead), reject_schema (answer 400 to requests carrying response_format).
+    answer may likewise be a function of the request body; it then answers classification requests
+    too, and may return the raw content text instead of a dict.
+
+    Requests with "stream": true get a text/event-stream answer: the JSON in STREAM_CHUNK-sized
+    deltas followed by a chatty trailer, one delta every chunk_delay seconds, then a usage chunk
+    and [DONE]. streams_completed and streams_cut count streams sent in full and streams the
+    client closed early. Every request body is
+    kept in requests as (backend name, body); in_flight/peak_in_flight count concurrent requests.
+    """
+
+    def __init__(self, delay: float = 0.0, answer: dict = None):
+        self.default = {"delay": delay, "hang": False, "status": 200, "message": "", "reject_schema": False,
+                        "chunk_delay": 0.005}
+        self.modes = {}
+        self.answer = answer or AADHAR_ANSWER
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.streams_completed = 0
+        self.streams_cut = 0
+        self._runner = None
+        self._closing = None
+        self.port = None
+
+    def configure(self, name: str, **mode):
+        self.modes[name] = dict(self.modes.get(name, self.default), **mode)
+
+    def url(self, name: str = "default") -> str:
+        return f"http://127.0.0.1:{self.port}/{name}/v1"
+
+    def count(self, name: str) -> int:
+        return sum(1 for backend, _ in self.requests if backend == name)
+
+    async def _chat(self, request):
+        name = request.match_info["name"]
+        body = await request.json()
+        self.requests.append((name, body))
+        mode = self.modes.get(name, self.default)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if mode["hang"]:
+                await self._closing.wait()  # Until the server shuts down
+            delay = mode["delay"]
+            await asyncio.sleep(delay(body) if callable(delay) else delay)
+        finally:
+            self.in_flight -= 1
+        if mode["reject_schema"] and "response_format" in body:
+            error = {"message": "response_format json_schema is not supported by this model",
+                     "type": "invalid_request_error"}
+            return web.json_response({"error": error}, status=400)
+        if mode["status"] != 200:
+            error = {"message": mode["message"] or "fake backend error", "type": "invalid_request_error"}
+            return web.json_response({"error": error}, status=mode["status"])
+        if callable(self.answer):
+            answer = self.answer(body)
+            content = answer if isinstance(answer, str) else json.dumps(answer)
+        else:
+            content = "aadhar" if body.get("max_tokens", 0) <= 5 else json.dumps(self.answer)
+        if body.get("stream"):
+            return await self._stream(request, body["model"], content + STREAM_TRAILER, mode["chunk_delay"])
+        return web.json_response({
+            "id": "fake", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        })
+
+    async def _stream(self, request, model: str, content: str, chunk_delay: float):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def send(chunk: dict):
+            chunk = dict({"id": "fake", "object": "chat.completion.chunk", "created": 0, "model": model}, **chunk)
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        try:
+            for i in range(0, len(content), STREAM_CHUNK):
+                await send({"choices": [{"index": 0, "delta": {"content": content[i:i + STREAM_CHUNK]}}]})
+                await asyncio.sleep(chunk_delay)
+            await send({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 10, "completion_tokens": len(content) // 4,
+                                  "total_tokens": 10 + len(content) // 4}})
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            self.streams_cut += 1
+            return response
+        self.streams_completed += 1
+        await response.write_eof()
+        return response
+
+    async def __aenter__(self):
+        self._closing = asyncio.Event()
+        app = web.Application()
+        app.router.add_post("/{name}/v1/chat/completions", self._chat)
+        self._runner = web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        # The pooled sessions belong to this test's event loop
+        await provider_client.close()
+        await close_http_client()
+        self._closing.set()
+        await self._runner.cleanup()
@@ -0,0 +1,126 @@
+"""Free-text model answers for the parser tests and benchmark, plus the original hand-written
+parsers (as they were before the table-driven engine) to compare against."""
+import re
+import json
+import random
+
+NAMES = ["Ravi Kumar", "PRIYA SHARMA", "Anil  Verma", "S K Gupta", "A"]
+NOISE = ["Here is the extracted information from the card.", "I hope this helps!", "```", "---",
+         "The image is slightly blurred but readable.", "Let me know if you need anything else."]
+BULLETS = ["", "* ", "- ", "**", "  "]
+SEPARATORS = [":", ": ", ":**", "**:", " : "]
+
+
+def _line(label: str, value: str, rng: random.Random) -> str:
+    return f"{rng.choice(BULLETS)}{label}{rng.choice(SEPARATORS)} {value}"
+
+
+def aadhar_answer(rng: random.Random) -> str:
+    fields = [("Name", rng.choice(NAMES)), (rng.choice(["Date Of Birth", "DOB", "Date of Birth"]), "12/03/1990"),
+              ("Gender", rng.choice(["Male", "Female", "M"])),
+              (rng.choice(["Aadhar No", "Aadhaar Number"]), rng.choice(["1234 5678 9012", "1234-5678-9012"])),
+              ("Address", rng.choice(["12, MG Road, Pune 411001", "S/O Ram, Near Temple, Jaipur *"]))]
+    lines = [_line(label, value, rng) for label, value in fields if rng.random() < 0.8]
+    lines += rng.choices(NOISE, k=rng.randint(0, 12))
+    rng.shuffle(lines)
+    return "\n".join(lines)
+
+
+def pan_answer(rng: random.Random) -> str:
+    # PAN answers keep the card's order; the free-text PAN patterns span lines
+    fields = [("PAN Card Number", "ABCDE1234F"), ("Name", rng.choice(NAMES).upper()),
+              ("Father's Name", "SURESH KUMAR"), ("Date of Birth", "01/02/1985")]
+    lines = []
+    for label, value in fields:
+        lines += rng.choices(NOISE, k=rng.randint(0, 3))
+        if rng.random() < 0.85:
+            lines.append(_line(label, value, rng))
+    return "\n".join(lines)
+
+
+def passport_answer(rng: random.Random) -> str:
+    fields = [(rng.choice(["Passport No", "Passport Number"]), "J1234567"), ("Surname", "SHARMA"),
+              ("Given Name", "PRIYA RANI"), ("Nationality", "INDIAN"), ("Sex", rng.choice(["F", "M"])),
+              ("Date of Birth", "01/01/1990"), ("Place of Birth", "DELHI"), ("Date of Issue", "01/01/2015"),
+              ("Date of Expiry", "31/12/2024"), ("Place of Issue", "MUMBAI"), ("Full Name", "PRIYA SHARMA")]
+    lines = [_line(label, value, rng) for label, value in fields if rng.random() < 0.8]
+    lines += rng.choices(NOISE, k=rng.randint(0, 12))
+    rng.shuffle(lines)
+    return "\n".join(lines)
+
+
+def corpus(size: int = 400, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    return {"aadhar": [aadhar_answer(rng) for _ in range(size)],
+            "pan": [pan_answer(rng) for _ in range(size)],
+            "passport": [passport_answer(rng) for _ in range(size)]}
+
+
+def legacy_parse_aadhar_details(text: str):
+    try:
+        json_match = re.search(r'\{[\s\S]*?\}(?=\s*\Z|\s*\{)', text, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group().strip())
+    except ValueError:
+        pass
+    patterns = {
+        'Name': r'(?:Name|NAME)[\s:*]+([A-Za-z\s]+)',
+        'Date_Of_Birth': r'(?:Date\s*Of?\s*Birth|DOB)[\s:*]+(\d{2}/\d{2}/\d{4})',
+        'Gender': r'(?:Gender|GENDER)[\s:*]+(\w+)',
+        'Aadhar_No': r'(?:Aadhar\s*No|Aadhaar\s*Number)[\s:*]+(\d{4}[\s-]?\d{4}[\s-]?\d{4})',
+        'Address': r'(?:Address|ADDRESS)[\s:*]+([^*]+?)(?=\s*\*|$)'
+    }
+    details = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        for key, pattern in patterns.items():
+            match = re.search(pattern, line, re.IGNORECASE)
+            if match and not details.get(key):
+                details[key] = match.group(1).strip()
+    return details
+
+
+def legacy_parse_pan_details(text: str):
+    patterns = {
+        'panCardNumber': r'(?:\*|\#|-|\s)*PAN Card Number(?:\*|\#|-|\s)*:(?:\*|\#|-|\s)*(\w{10})',
+        'name': r'(?:\*|\#|-|\s)*Name(?:\*|\#|-|\s)*:(?:\*|\#|-|\s)*([\w\s]+)',
+        'fatherName': r'(?:\*|\#|-|\s)*Father\'s Name(?:\*|\#|-|\s)*:(?:\*|\#|-|\s)*([\w\s]+)',
+        'dateOfBirth': r'(?:\*|\#|-|\s)*Date of Birth(?:\*|\#|-|\s)*:(?:\*|\#|-|\s)*(\d{2}/\d{2}/\d{4})'
+    }
+    details = {key: '' for key in patterns}
+    for key, pattern in patterns.items():
+        match = re.search(pattern, text, re.MULTILINE)
+        if match:
+            details[key] = match.group(1).replace('*', '').strip()
+    return details
+
+
+def legacy_parse_passport_details(text: str):
+    patterns = {
+        'Passport_No': r'(?:Passport\s*(?:No|Number)[:\s\-*"]*)([A-Z]{1,2}\d{7})',
+        'Surname': r'(?:Surname[:\s\-*"]*)([A-Za-z]+)',
+        'Given_Name': r'(?:Given\s*Name[:\s\-*"]*)([A-Za-z\s]+)',
+        'Nationality': r'(?:Nationality[:\s\-*"]*)([A-Za-z]+)',
+        'Sex': r'(?:Sex[:\s\-*"]*)([MF])',
+        'Date_of_Birth': r'(?:Date\s*of\s*Birth[:\s\-*"]*)(\d{2}/\d{2}/\d{4})',
+        'Place_of_Birth': r'(?:Place\s*of\s*Birth[:\s\-*"]*)([A-Za-z\s]+)',
+        'Date_of_Issue': r'(?:Date\s*of\s*Issue[:\s\-*"]*)(\d{2}/\d{2}/\d{4})',
+        'Date_of_Expiry': r'(?:Date\s*of\s*Expiry[:\s\-*"]*)(\d{2}/\d{2}/\d{4})',
+        'Place_of_Issue': r'(?:Place\s*of\s*Issue[:\s\-*"]*)([A-Za-z\s]+)',
+        'Full_Name': r'(?:Full\s*Name[:\s\-*"]*)([A-Za-z\s]+)'
+    }
+    details = {key: '' for key in patterns}
+    for key, pattern in patterns.items():
+        match = re.search(pattern, text, re.MULTILINE | re.IGNORECASE)
+        if match:
+            details[key] = match.group(1).strip()
+    if details['Surname'] and details['Given_Name']:
+        details['Full_Name'] = f"{details['Surname']} {details['Given_Name']}".strip()
+    return details
+
+
+LEGACY_PARSERS = {
+    'aadhar': legacy_parse_aadhar_details,
+    'pan': legacy_parse_pan_details,
+    'passport': legacy_parse_passport_details,
+}
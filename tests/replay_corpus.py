@@ -0,0 +1,78 @@
+"""Replay corpus for tests/bench_retries.py: scripted provider answers for a fixed set of documents.
+
+Each document has a type and its true field values. Every model call on it is answered from a
+random stream seeded by (document, attempt), so both modes of the benchmark see the same documents
+and the same omissions. Without a schema the model answers in a mix of styles (STYLES); with one
+it always answers plain JSON. In both modes each requested field is left out OMIT_RATE of the
+time, and UNREADABLE_RATE of the documents have one field the model never reads.
+"""
+import re
+import json
+import random
+from models.ocr_model import REQUIRED_FIELDS
+
+SEED = 25
+OMIT_RATE = 0.05
+UNREADABLE_RATE = 0.03
+# Answer style without a schema -> share of answers
+STYLES = {"json": 0.45, "fenced": 0.20, "bullets": 0.15, "python_dict": 0.10, "prose": 0.10}
+
+VALUES = {
+    "aadhar": {"Name": "Ravi Kumar", "Date_Of_Birth": "01/01/1990", "Gender": "Male",
+               "Aadhar_No": "1234 5678 9012", "Address": "12 MG Road, Pune 411001"},
+    "pan": {"panCardNumber": "ABCDE1234F", "name": "RAVI KUMAR", "fatherName": "SURESH KUMAR",
+            "dateOfBirth": "01/01/1990"},
+    "passport": {"Passport_No": "J8369854", "Surname": "KUMAR", "Given_Name": "RAVI", "Full_Name": "KUMAR RAVI",
+                 "Nationality": "INDIAN", "Sex": "M", "Date_of_Birth": "01/01/1990", "Place_of_Birth": "PUNE",
+                 "Date_of_Issue": "01/01/2020", "Date_of_Expiry": "31/12/2029", "Place_of_Issue": "MUMBAI"},
+}
+# Labels as a model prints them in free text
+LABELS = {"Aadhar_No": "Aadhar No", "panCardNumber": "PAN Card Number", "fatherName": "Father's Name",
+          "dateOfBirth": "Date of Birth", "name": "Name"}
+
+
+def _label(field: str) -> str:
+    return LABELS.get(field, field.replace("_", " "))
+
+
+def documents(size: int = 600) -> list:
+    """[(document id, doc_type, unreadable field or None)], the same list on every call."""
+    rng = random.Random(SEED)
+    docs = []
+    for number in range(size):
+        doc_type = rng.choice(sorted(VALUES))
+        unreadable = rng.choice(REQUIRED_FIELDS[doc_type]) if rng.random() < UNREADABLE_RATE else None
+        docs.append((f"doc{number:04d}", doc_type, unreadable))
+    return docs
+
+
+def render(fields: dict, style: str) -> str:
+    if style == "json":
+        return json.dumps(fields)
+    if style == "fenced":
+        return f"Here are the details I could read:\n```json\n{json.dumps(fields, indent=2)}\n```\nHope this helps!"
+    if style == "bullets":
+        return "\n".join(f"* **{_label(field)}:** {value}" for field, value in fields.items())
+    if style == "python_dict":
+        return repr(fields)
+    return " ".join(f"The {_label(field)} reads {value}." for field, value in fields.items())
+
+
+def requested_fields(body: dict, doc_type: str) -> list:
+    """Fields a request asks for: the schema's properties, a focused retry's list, or all of them."""
+    if "response_format" in body:
+        return list(body["response_format"]["schema"]["properties"])
+    focused = re.match(r"Extract (.+) from the ", body["messages"][1]["content"][0]["text"])
+    if focused:
+        return focused.group(1).split(", ")
+    return list(VALUES[doc_type])
+
+
+def answer(document: tuple, attempt: int, body: dict, structured: bool) -> str:
+    """Content of the model's answer to body, the document's attempt-th call (counting from 0)."""
+    _, doc_type, unreadable = document
+    rng = random.Random(f"{SEED}-{document[0]}-{attempt}")
+    fields = {field: VALUES[doc_type][field] for field in requested_fields(body, doc_type)
+              if field != unreadable and rng.random() >= OMIT_RATE}
+    style = "json" if structured else rng.choices(list(STYLES), weights=list(STYLES.values()))[0]
+    return render(fields, style)
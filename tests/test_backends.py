@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from together import error as together_error
+from fakes import FakeProvider
+from services import backends
+from services.backends import Backend, BackendRouter
+from services.provider_client import provider_client
+
+
+@pytest.fixture(autouse=True)
+def no_exploration(monkeypatch):
+    monkeypatch.setattr(backends, "EXPLORE_RATE", 0)
+
+
+def _router(fake, routes=None, attempt_timeout=5.0) -> BackendRouter:
+    return BackendRouter([Backend(name, f"{name}-model", base_url=fake.url(name), structured_output=False)
+                          for name in ("a", "b")], routes or {}, attempt_timeout=attempt_timeout)
+
+
+async def _ask(router, task="aadhar"):
+    async def attempt(backend):
+        response = await provider_client.create_completion(
+            {"model": backend.model, "messages": [{"role": "user", "content": "hi"}], "max_tokens": 100},
+            backend.client)
+        return response.model
+    return await router.call(task, attempt)
+
+
+def _with_fake(test):
+    async def run():
+        async with FakeProvider() as fake:
+            return await test(fake)
+    return asyncio.run(run())
+
+
+def test_routes_pick_the_backend_per_task():
+    async def test(fake):
+        router = _router(fake, {"passport": ["b"], "*": ["a"]})
+        assert await _ask(router, "passport") == "b-model"
+        assert await _ask(router, "aadhar") == "a-model"
+        assert (fake.count("a"), fake.count("b")) == (1, 1)
+    _with_fake(test)
+
+
+def test_transient_error_fails_over_and_counts_against_the_backend():
+    async def test(fake):
+        fake.configure("a", status=503, message="overloaded")
+        router = _router(fake)
+        assert await _ask(router) == "b-model"
+        return router
+    router = _with_fake(test)
+    a = router.backends["a"]
+    assert router.failovers == 1
+    assert (a.failures, a.consecutive_failures) == (1, 1) and a.error_rate > 0
+
+
+def test_permanent_error_is_raised_without_failover_or_penalty():
+    async def test(fake):
+        fake.configure("a", status=400, message="image_url is not a valid URL")
+        router = _router(fake)
+        with pytest.raises(together_error.InvalidRequestError):
+            await _ask(router)
+        assert fake.count("b") == 0
+        return router
+    router = _with_fake(test)
+    a = router.backends["a"]
+    assert router.failovers == 0
+    assert (a.failures, a.consecutive_failures, a.error_rate) == (0, 0, 0.0)
+
+
+def test_hanging_backend_times_out_and_fails_over():
+    async def test(fake):
+        fake.configure("a", hang=True)
+        router = _router(fake, attempt_timeout=0.2)
+        assert await _ask(router) == "b-model"
+        return router
+    router = _with_fake(test)
+    assert router.backends["a"].failures == 1
+    assert router.failovers == 1
+
+
+def test_cancelled_call_leaves_backend_health_alone():
+    async def test(fake):
+        fake.configure("a", hang=True)
+        router = _router(fake, {"*": ["a"]})
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(_ask(router), timeout=0.2)  # The request deadline, not the attempt timeout
+        return router
+    router = _with_fake(test)
+    # The caller gave up (request deadline, lost hedge); that says nothing about the backend
+    a = router.backends["a"]
+    assert (a.failures, a.consecutive_failures, a.latency) == (0, 0, {})
+    assert a.available()
+
+
+def test_failing_backend_cools_down_then_gets_one_call(monkeypatch):
+    monkeypatch.setattr(backends, "FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(backends, "COOLDOWN_SECONDS", 0.2)
+
+    async def test(fake):
+        fake.configure("a", status=503)
+        router = _router(fake, {"classify": ["a"]})
+        a = router.backends["a"]
+        for _ in range(2):
+            with pytest.raises(together_error.ServiceUnavailableError):
+                await _ask(router, "classify")
+        assert not a.available()
+        assert [b.name for b in router.candidates("aadhar")] == ["b", "a"]
+        assert await _ask(router, "aadhar") == "b-model"
+        assert fake.count("a") == 2  # Skipped while cooling down
+
+        await asyncio.sleep(0.25)
+        assert a.available()
+        # Failing and never answered: behind the backend with a known latency, but tried again where it is alone
+        assert [b.name for b in router.candidates("aadhar")] == ["b", "a"]
+        with pytest.raises(together_error.ServiceUnavailableError):
+            await _ask(router, "classify")
+        assert fake.count("a") == 3
+        assert not a.available()  # The failed probe restarts the cooldown
+    _with_fake(test)
@@ -0,0 +1,46 @@
+import time
+import sqlite3
+import asyncio
+from services.cache_service import ResultCache
+
+RESULT = {"document_type": "aadhar", "parsed_data": {"Name": "Ravi Kumar"}}
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+
+    async def run():
+        ResultCache(db_path=db_path).set("url:aadhar:a", RESULT)
+        await asyncio.sleep(0.1)  # The disk write happens in the background
+        restarted = ResultCache(db_path=db_path)
+        return await restarted.get("url:aadhar:a"), await restarted.get("url:aadhar:b"), restarted.stats()
+
+    found, missing, stats = asyncio.run(run())
+    assert found == RESULT and missing is None
+    assert (stats["disk_hits"], stats["misses"]) == (1, 1)
+
+
+def test_disk_lookup_does_not_block_the_event_loop(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResultCache(db_path=db_path)
+    cache.set("url:aadhar:a", RESULT)  # No running loop: written straight away
+    other_process = sqlite3.connect(db_path, isolation_level=None)
+
+    async def run():
+        restarted = ResultCache(db_path=db_path)
+        other_process.execute("BEGIN EXCLUSIVE")  # Readers now wait on the busy timeout
+        lookup = asyncio.create_task(restarted.get("url:aadhar:a"))
+        gaps, last = [], time.monotonic()
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+        assert not lookup.done()
+        other_process.execute("COMMIT")
+        return gaps, await lookup
+
+    gaps, found = asyncio.run(run())
+    assert max(gaps) < 0.1
+    assert found == RESULT
+    other_process.close()
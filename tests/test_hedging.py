@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from controllers import ocr_controller
+from services import hedging
+from services.hedging import hedged_call, HedgeStats
+
+COMPLETE = {"Name": "Ravi Kumar", "Date_Of_Birth": "01/01/1990", "Gender": "M",
+            "Aadhar_No": "1234 5678 9012", "Address": "Pune"}
+HEDGE_DELAY = 0.05
+
+
+def _is_complete(parsed):
+    return all(parsed.get(field) for field in COMPLETE)
+
+
+class ScriptedCalls:
+    """make_call for hedged_call: each call sleeps, then returns or raises its scripted outcome ("hang" never ends)."""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.started = 0
+        self.cancelled = []
+
+    async def __call__(self):
+        number = self.started
+        self.started += 1
+        delay, outcome = self.steps[number]
+        try:
+            if outcome == "hang":
+                await asyncio.Event().wait()
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(number)
+            raise
+        if isinstance(outcome, Exception):
+            raise outcome
+        return dict(outcome)
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    stats = HedgeStats()
+    monkeypatch.setattr(hedging, "hedge_stats", stats)
+    return stats
+
+
+def _hedge(calls):
+    async def run():
+        results = await hedged_call(calls, HEDGE_DELAY, _is_complete)
+        await asyncio.sleep(0)  # Let the loser see its cancellation
+        return results
+    return asyncio.run(run())
+
+
+def test_fast_primary_launches_no_hedge(stats):
+    calls = ScriptedCalls((0, COMPLETE))
+    assert _hedge(calls) == [COMPLETE]
+    assert calls.started == 1
+    assert (stats.calls, stats.launched, stats.wasted) == (1, 0, 0)
+
+
+def test_hedge_wins_and_the_primary_is_cancelled(stats):
+    calls = ScriptedCalls((0, "hang"), (0, COMPLETE))
+    assert _hedge(calls) == [COMPLETE]
+    assert calls.cancelled == [0]
+    assert (stats.launched, stats.wins, stats.wasted) == (1, 1, 1)
+
+
+def test_primary_wins_after_the_hedge_started(stats):
+    calls = ScriptedCalls((0.1, COMPLETE), (5, COMPLETE))
+    assert _hedge(calls) == [COMPLETE]
+    assert calls.cancelled == [1]
+    assert (stats.launched, stats.wins, stats.wasted) == (1, 0, 1)
+
+
+def test_two_incomplete_results_are_both_returned_for_merging(stats):
+    calls = ScriptedCalls((0.1, {"Name": "Ravi Kumar"}), (0, {"Address": "Pune"}))
+    assert _hedge(calls) == [{"Address": "Pune"}, {"Name": "Ravi Kumar"}]  # In finishing order
+    assert (stats.merged, stats.wasted) == (1, 0)
+
+
+def test_failed_call_falls_back_to_the_other(stats):
+    calls = ScriptedCalls((0.1, ConnectionError("reset")), (0.1, COMPLETE))
+    assert _hedge(calls) == [COMPLETE]
+    assert calls.cancelled == []
+
+
+def test_failure_next_to_an_incomplete_result_counts_as_wasted(stats):
+    calls = ScriptedCalls((0.1, ConnectionError("reset")), (0.1, {"Name": "Ravi Kumar"}))
+    assert _hedge(calls) == [{"Name": "Ravi Kumar"}]
+    assert (stats.merged, stats.wasted) == (0, 1)
+
+
+def test_both_failing_raises(stats):
+    calls = ScriptedCalls((0.1, ConnectionError("first")), (0.2, ConnectionError("second")))
+    with pytest.raises(ConnectionError, match="first"):
+        _hedge(calls)
+
+
+def test_controller_merges_hedged_halves(monkeypatch, stats):
+    """Two incomplete hedged answers fill the document between them, without a retry."""
+    halves = ScriptedCalls((0.1, {"Name": "Ravi Kumar", "Date_Of_Birth": "01/01/1990", "Gender": "M"}),
+                           (0, {"Aadhar_No": "1234 5678 9012", "Address": "Pune"}))
+
+    class Extractor:
+        async def extract(self, image_url, doc_type, fields=None, stream=None, on_partial=None):
+            return await halves()
+
+    monkeypatch.setattr(ocr_controller, "llm_extractor", Extractor())
+    monkeypatch.setattr(ocr_controller, "hedge_delay_for", lambda doc_type: HEDGE_DELAY)
+
+    async def collect():
+        return [event async for event in ocr_controller._extraction_events(
+            "https://example.com/card.jpg", "aadhar", hedge=True, reroute=False)]
+
+    events = asyncio.run(collect())
+    assert [e["event"] for e in events] == ["attempt_started", "result"]
+    assert events[-1]["result"]["parsed_data"] == COMPLETE
+    assert halves.started == 2 and stats.merged == 1
@@ -0,0 +1,164 @@
+import base64
+import asyncio
+import pytest
+from aiohttp import web
+from services import image_service
+from services.image_service import fetch_image_bytes, check_fetch_url, UnsafeURLError, close_http_client
+
+IMAGE = b"\xff\xd8fake jpeg bytes\xff\xd9"
+
+
+class FixtureServer:
+    """Local HTTP server for the fetch layer: /card.jpg, and /redirect?to=<url> answering 302."""
+
+    def __init__(self):
+        self.paths = []
+
+    async def _handle(self, request):
+        self.paths.append(request.path_qs)
+        if request.path == "/redirect":
+            raise web.HTTPFound(request.query["to"])
+        return web.Response(body=IMAGE, content_type="image/jpeg")
+
+    def url(self, path: str, host: str = "127.0.0.1") -> str:
+        return f"http://{host}:{self.port}{path}"
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        await close_http_client()
+        await self._runner.cleanup()
+
+
+def _fetch(server_test):
+    async def run():
+        async with FixtureServer() as server:
+            return await server_test(server)
+    return asyncio.run(run())
+
+
+def test_loopback_is_refused_by_default():
+    async def test(server):
+        with pytest.raises(UnsafeURLError, match="non-public"):
+            await fetch_image_bytes(server.url("/card.jpg"))
+        return server.paths
+    assert _fetch(test) == []
+
+
+def test_fetch_and_redirects_when_private_hosts_are_allowed(monkeypatch):
+    monkeypatch.setattr(image_service, "FETCH_ALLOW_PRIVATE", True)
+
+    async def test(server):
+        assert await fetch_image_bytes(server.url("/card.jpg")) == IMAGE
+        assert await fetch_image_bytes(server.url(f"/redirect?to={server.url('/card.jpg')}")) == IMAGE
+    _fetch(test)
+
+
+def test_every_redirect_hop_is_checked(monkeypatch):
+    monkeypatch.setattr(image_service, "FETCH_ALLOW_PRIVATE", True)
+    monkeypatch.setattr(image_service, "FETCH_ALLOWED_HOSTS", {"127.0.0.1"})
+
+    async def test(server):
+        target = server.url("/card.jpg", host="localhost")
+        with pytest.raises(UnsafeURLError, match="not in OCR_FETCH_ALLOWED_HOSTS"):
+            await fetch_image_bytes(server.url(f"/redirect?to={target}"))
+        return server.paths
+    paths = _fetch(test)
+    assert len(paths) == 1 and paths[0].startswith("/redirect")  # The redirect target was never requested
+
+
+def test_redirect_loops_are_cut_off(monkeypatch):
+    monkeypatch.setattr(image_service, "FETCH_ALLOW_PRIVATE", True)
+
+    async def test(server):
+        url = server.url("/card.jpg")
+        for _ in range(image_service.MAX_FETCH_REDIRECTS + 1):
+            url = server.url(f"/redirect?to={url}")
+        with pytest.raises(UnsafeURLError, match="redirects"):
+            await fetch_image_bytes(url)
+    _fetch(test)
+
+
+def test_size_limit(monkeypatch):
+    monkeypatch.setattr(image_service, "FETCH_ALLOW_PRIVATE", True)
+    monkeypatch.setattr(image_service, "MAX_IMAGE_BYTES", 4)
+
+    async def test(server):
+        with pytest.raises(ValueError, match="exceeds"):
+            await fetch_image_bytes(server.url("/card.jpg"))
+    _fetch(test)
+
+
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "ftp://example.com/card.jpg",
+    "gopher://127.0.0.1:6379/_INFO",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.5/card.jpg",
+    "http://192.168.1.1/card.jpg",
+    "http://[::1]:8000/card.jpg",
+    "http://[::ffff:127.0.0.1]/card.jpg",
+    "http://0.0.0.0/card.jpg",
+    "http://100.64.0.1/card.jpg",
+    "http:///card.jpg",
+])
+def test_unsafe_urls_are_refused(url):
+    with pytest.raises(UnsafeURLError):
+        asyncio.run(check_fetch_url(url))
+
+
+def test_public_address_passes():
+    asyncio.run(check_fetch_url("https://93.184.215.14/card.jpg"))
+
+
+def test_data_urls_are_decoded_without_a_request():
+    assert asyncio.run(fetch_image_bytes("data:image/jpeg;base64,/9hmYWtl")) == b"\xff\xd8fake"
+
+
+@pytest.mark.parametrize("size", [0, 1, 5, 6, 7])
+def test_data_urls_are_built_in_chunks(monkeypatch, size):
+    monkeypatch.setattr(image_service, "DATA_URL_CHUNK_BYTES", 3)
+    data = bytes(range(200, 200 + size))
+    url = image_service.to_data_url(memoryview(data), "image/png")
+    assert url == "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+    assert asyncio.run(fetch_image_bytes(url)) == data
+
+
+def test_data_urls_are_size_checked_before_decoding(monkeypatch):
+    monkeypatch.setattr(image_service, "MAX_IMAGE_BYTES", 6)
+    assert asyncio.run(fetch_image_bytes("data:image/jpeg;base64,/9hmYWtlAA==")) == b"\xff\xd8fake\x00"
+    with pytest.raises(ValueError, match="exceeds"):
+        asyncio.run(fetch_image_bytes("data:image/jpeg;base64," + "A" * 16))
+
+
+@pytest.mark.parametrize("payload", ["/9hm YWtl", "/9hm*Wtl", "/9hmYWtl!"])
+def test_malformed_data_urls_are_refused(payload):
+    with pytest.raises(ValueError):
+        asyncio.run(fetch_image_bytes(f"data:image/jpeg;base64,{payload}"))
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8000/statement.pdf",
+    "http://169.254.169.254/latest/meta-data/",
+    "file:///etc/passwd",
+])
+def test_process_pdf_refuses_unsafe_urls(monkeypatch, url):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    class NoRequests:
+        def stream(self, method, url):
+            raise AssertionError(f"{url} was requested")
+    monkeypatch.setattr(image_service, "get_http_client", NoRequests)
+
+    response = TestClient(app).post("/api/v1/ocr/process-pdf", params={"pdf_url": url})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Refusing to fetch PDF")
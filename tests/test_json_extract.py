@@ -0,0 +1,117 @@
+import time
+import json
+import pytest
+from utils.json_extract import extract_json_object, locate_json_object, JSONObjectScanner
+from utils.parsers import DOCUMENT_PARSERS, parse_aadhar_details
+
+ANSWER = {"Name": "Ravi Kumar", "Gender": "M"}
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(ANSWER),
+    "```json\n" + json.dumps(ANSWER) + "\n```\nLet me know if you need anything else.",
+    "Here you go: " + json.dumps(ANSWER) + " {not json}",
+    '{"Name": "Ravi Kumar", "Gender": "M",}',
+    "{ stray brace " + json.dumps(ANSWER),
+])
+def test_finds_the_object_in_chatter(text):
+    assert extract_json_object(text) == ANSWER
+
+
+def test_braces_inside_strings_are_ignored():
+    assert extract_json_object('{"Address": "Flat {3}, \\"B\\" wing"}') == {"Address": 'Flat {3}, "B" wing'}
+
+
+def test_chunked_feed_matches_one_shot():
+    text = "prefix " + json.dumps({"a": {"b": "}{"}, "c": "d"}) + " suffix"
+    scanner = JSONObjectScanner()
+    found = []
+    for i in range(0, len(text), 3):
+        found += scanner.feed(text[i:i + 3])
+    assert found == [extract_json_object(text)]
+
+
+# Pathological model output: every case must return quickly and never raise
+
+def test_nesting_beyond_the_recursion_limit_is_unparseable():
+    deep = '{"a":' * 1000 + '1' + '}' * 1000
+    assert extract_json_object(deep) is None
+    for parse in DOCUMENT_PARSERS.values():
+        parse(deep)
+
+
+def test_deep_unbalanced_braces():
+    result, elapsed = _timed(extract_json_object, '{' * 50000 + '}' * 50000)
+    assert result is None
+    assert elapsed < 1.0
+
+
+def test_unterminated_object():
+    result, elapsed = _timed(extract_json_object, '{"Name": "Ravi' + ' x' * 100000)
+    assert result is None
+    assert elapsed < 1.0
+
+
+def test_many_small_invalid_objects():
+    result, elapsed = _timed(extract_json_object, '{x}' * 70000)
+    assert result is None
+    assert elapsed < 1.0
+
+
+@pytest.mark.parametrize("line, address", [
+    ("Address:" + " " * 100000, None),
+    ("Address:" + " " * 100000 + "x", "x"),
+    ("Address: a" + " " * 100000 + "b", "a" + " " * 100000 + "b"),
+])
+def test_long_whitespace_run_after_a_label(line, address):
+    result, elapsed = _timed(parse_aadhar_details, line)
+    assert elapsed < 0.5
+    if address is not None:
+        assert result["Address"] == address
+
+
+def test_locate_returns_the_object_span():
+    text = 'Sure! {"Name": "Ravi"} and {"Name": "Other"}'
+    obj, (start, end) = locate_json_object(text)
+    assert obj == {"Name": "Ravi"} and text[start:end] == '{"Name": "Ravi"}'
+    assert locate_json_object("no object here") == (None, None)
+    # Recovered from inside a stray unbalanced brace
+    obj, (start, end) = locate_json_object('{ note {"Name": "Ravi"}')
+    assert obj == {"Name": "Ravi"} and (start, end) == (7, 23)
+
+
+def _stream_partials(text: str, chunk: int) -> list:
+    scanner = JSONObjectScanner()
+    partials = []
+    for i in range(0, len(text), chunk):
+        scanner.feed(text[i:i + chunk])
+        partials.append(scanner.partial_fields())
+    return partials
+
+
+def test_partial_fields_grow_and_are_unescaped():
+    text = '{"Name": "Ravi \\"R\\" Kumar", "Address": "Flat 3\\nPune", "Gender": "M"}'
+    partials = _stream_partials(text, 1)
+    assert partials[-1] == {}  # The object is complete: nothing partial left
+    last = partials[-2]
+    assert last == {"Name": 'Ravi "R" Kumar', "Address": "Flat 3\nPune", "Gender": "M"}
+    assert all(len(a) <= len(b) for a, b in zip(partials, partials[1:-1]))
+
+
+def test_partial_fields_restart_with_a_new_object():
+    scanner = JSONObjectScanner()
+    scanner.feed('{"Name": "A"} then {"Gender": "M", ')
+    assert scanner.partial_fields() == {"Gender": "M"}
+
+
+def test_partial_fields_only_scan_new_text():
+    text = "{" + ", ".join(f'"field{i}": "value {i}"' for i in range(2000))
+    partials, elapsed = _timed(_stream_partials, text, 10)
+    assert len(partials[-1]) == 2000
+    assert elapsed < 1.0
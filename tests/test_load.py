@@ -0,0 +1,42 @@
+import time
+import uuid
+import asyncio
+from fakes import FakeProvider
+from controllers.ocr_controller import process_document_controller
+from services import ocr_service
+from services.backends import Backend, BackendRouter
+
+PROVIDER_DELAY = 0.1
+
+
+async def _requests_per_second(concurrency: int, total: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    run = uuid.uuid4().hex
+
+    async def one(index):
+        async with semaphore:
+            # Distinct URLs so neither the result cache nor request coalescing kicks in
+            result = await process_document_controller(f"https://example.com/{run}/{index}.jpg", "aadhar")
+            assert result["parsed_data"]["Aadhar_No"] == "1234 5678 9012"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+def test_throughput_grows_with_concurrency(monkeypatch):
+    """Model calls wait on the network without blocking the event loop, so concurrent requests overlap."""
+    async def run():
+        async with FakeProvider(delay=PROVIDER_DELAY) as fake:
+            monkeypatch.setattr(ocr_service, "backend_router",
+                                BackendRouter([Backend("fake", "fake-model", base_url=fake.url("fake"))], {}))
+            rates = {c: await _requests_per_second(c, max(8, 2 * c)) for c in (1, 8, 32)}
+            return rates, fake.peak_in_flight
+
+    rates, peak = asyncio.run(run())
+    # Loose bounds, so a busy CI machine does not fail the test: serial calls cannot beat the
+    # provider delay, and anything well above serial throughput means the calls overlapped
+    assert rates[1] < 1.2 / PROVIDER_DELAY
+    assert rates[8] > 2 * rates[1]
+    assert rates[32] > rates[8]
+    assert peak > 8
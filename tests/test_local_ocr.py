@@ -0,0 +1,26 @@
+import pytest
+from services import local_ocr
+
+
+@pytest.fixture(autouse=True)
+def fresh_flag():
+    local_ocr.local_ocr_enabled.cache_clear()
+    yield
+    local_ocr.local_ocr_enabled.cache_clear()
+
+
+@pytest.mark.parametrize("requested, installed, enabled", [
+    (False, True, False),
+    (True, True, True),
+    (True, False, False),
+])
+def test_local_ocr_enabled_needs_the_setting_and_the_dependencies(monkeypatch, requested, installed, enabled):
+    monkeypatch.setattr(local_ocr, "LOCAL_OCR_ENABLED", requested)
+    monkeypatch.setattr(local_ocr, "local_ocr_available", lambda: installed)
+    assert local_ocr.local_ocr_enabled() is enabled
+
+
+def test_regex_fields_from_ocr_lines():
+    lines = ["INCOME TAX DEPARTMENT", "Permanent Account Number", "abcde1234f", "RAVI KUMAR"]
+    assert local_ocr.extract_regex_fields(lines, "pan") == {"panCardNumber": "ABCDE1234F"}
+    assert local_ocr.extract_regex_fields(["1234 5678 9012"], "aadhar") == {"Aadhar_No": "1234 5678 9012"}
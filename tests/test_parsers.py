@@ -0,0 +1,42 @@
+import pytest
+from parser_corpus import corpus, LEGACY_PARSERS
+from models.ocr_model import REQUIRED_FIELDS
+from utils.parsers import DOCUMENT_PARSERS
+
+CORPUS = corpus()
+
+
+@pytest.mark.parametrize("doc_type", sorted(DOCUMENT_PARSERS))
+def test_free_text_answers_parse_like_the_original_parsers(doc_type):
+    for text in CORPUS[doc_type]:
+        assert DOCUMENT_PARSERS[doc_type](text) == LEGACY_PARSERS[doc_type](text), text
+
+
+@pytest.mark.parametrize("doc_type", sorted(DOCUMENT_PARSERS))
+def test_corpus_exercises_every_field(doc_type):
+    found = set()
+    for text in CORPUS[doc_type]:
+        found.update(key for key, value in DOCUMENT_PARSERS[doc_type](text).items() if value)
+    assert found >= set(REQUIRED_FIELDS[doc_type])
+
+
+def test_label_regexes_skip_the_parsed_json():
+    text = ('{"panCardNumber": "ABCDE1234F", "name": "", "fatherName": "SURESH KUMAR", '
+            '"dateOfBirth": "01/02/1985"}')
+    assert DOCUMENT_PARSERS["pan"](text) == {"panCardNumber": "ABCDE1234F", "name": "",
+                                              "fatherName": "SURESH KUMAR", "dateOfBirth": "01/02/1985"}
+
+
+def test_prose_next_to_json_still_fills_missing_fields():
+    text = '{"panCardNumber": "ABCDE1234F", "name": ""}\nName: RAVI KUMAR\n'
+    assert DOCUMENT_PARSERS["pan"](text)["name"] == "RAVI KUMAR"
+
+
+@pytest.mark.parametrize("text", [
+    "The Name of the holder is not legible.",
+    "Surname unclear, Sex marker smudged",
+    "Renamed: Ravi",
+])
+def test_labels_need_a_whole_word_and_a_colon(text):
+    for doc_type, parse in DOCUMENT_PARSERS.items():
+        assert not any(parse(text).values()), (doc_type, parse(text))
@@ -0,0 +1,126 @@
+import time
+import asyncio
+import pytest
+from fastapi import HTTPException
+from together import error as together_error
+from controllers import ocr_controller
+from services.retry_policy import RetryPolicy
+
+COMPLETE = {"Name": "Ravi Kumar", "Date_Of_Birth": "01/01/1990", "Gender": "M",
+            "Aadhar_No": "1234 5678 9012", "Address": "Pune"}
+
+
+class ScriptedExtractor:
+    """Fake provider: each extract() call plays the next step, an exception, "hang" or parsed fields."""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = []
+
+    async def extract(self, image_url, doc_type, fields=None, stream=None, on_partial=None):
+        self.calls.append((time.monotonic(), fields))
+        step = self.steps.pop(0)
+        if step == "hang":
+            await asyncio.Event().wait()
+        if isinstance(step, Exception):
+            raise step
+        return dict(step)
+
+
+    async def classify(self, image_url):
+        self.calls.append((time.monotonic(), "classify"))
+        return "pan"
+
+
+def _run(monkeypatch, extractor, policy, reroute=False):
+    monkeypatch.setattr(ocr_controller, "llm_extractor", extractor)
+
+    async def collect():
+        events = []
+        try:
+            async for event in ocr_controller._extraction_events("https://example.com/card.jpg", "aadhar",
+                                                                 retry_policy=policy, reroute=reroute):
+                events.append(event)
+        except HTTPException as e:
+            events.append({"event": "raised", "status_code": e.status_code})
+        return events
+
+    return asyncio.run(collect())
+
+
+def test_transient_error_is_retried(monkeypatch):
+    extractor = ScriptedExtractor(together_error.ServiceUnavailableError("overloaded", http_status=503), COMPLETE)
+    events = _run(monkeypatch, extractor, RetryPolicy(max_retries=3, base_delay=0.01))
+    assert [e["event"] for e in events] == ["attempt_started", "retry_scheduled", "attempt_started", "result"]
+    assert events[-1]["result"]["parsed_data"]["Aadhar_No"] == "1234 5678 9012"
+    assert len(extractor.calls) == 2
+
+
+def test_retry_after_header_is_honored(monkeypatch):
+    throttled = together_error.RateLimitError("slow down", headers={"Retry-After": "0.3"}, http_status=429)
+    extractor = ScriptedExtractor(throttled, COMPLETE)
+    events = _run(monkeypatch, extractor, RetryPolicy(max_retries=3, base_delay=0.01))
+    retry = next(e for e in events if e["event"] == "retry_scheduled")
+    assert retry["delay"] == 0.3
+    (first, _), (second, _) = extractor.calls
+    assert second - first >= 0.3
+    assert events[-1]["event"] == "result"
+
+
+def test_permanent_error_is_not_retried(monkeypatch):
+    extractor = ScriptedExtractor(together_error.InvalidRequestError("bad image URL", http_status=400), COMPLETE)
+    events = _run(monkeypatch, extractor, RetryPolicy(max_retries=3, base_delay=0.01))
+    assert events[-1] == {"event": "raised", "status_code": 500}
+    assert len(extractor.calls) == 1
+
+
+def test_deadline_caps_total_latency(monkeypatch):
+    extractor = ScriptedExtractor("hang", "hang", "hang")
+    started = time.monotonic()
+    events = _run(monkeypatch, extractor, RetryPolicy(max_retries=3, base_delay=0.01, deadline=0.3))
+    elapsed = time.monotonic() - started
+    assert events[-1] == {"event": "raised", "status_code": 500}
+    assert 0.3 <= elapsed < 1.0
+    assert len(extractor.calls) == 1
+
+
+def test_backoff_stays_within_the_jittered_ceiling():
+    policy = RetryPolicy(base_delay=0.5, max_delay=8)
+    for attempt in range(8):
+        ceiling = min(8, 0.5 * 2 ** attempt)
+        assert all(0 <= policy.backoff(attempt) <= ceiling for _ in range(50))
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (together_error.RateLimitError("429", http_status=429), True),
+    (together_error.Timeout("timed out"), True),
+    (asyncio.TimeoutError(), True),
+    (together_error.InvalidRequestError("bad request", http_status=400), False),
+    (together_error.AuthenticationError("bad key", http_status=401), False),
+    (HTTPException(status_code=503), True),
+    (HTTPException(status_code=404), False),
+])
+def test_only_transient_errors_are_retryable(error, retryable):
+    assert RetryPolicy().is_retryable(error) is retryable
+
+
+@pytest.mark.parametrize("doc_type, parsed, mismatch", [
+    ("aadhar", {"Aadhar_No": "1234 5678 9012"}, False),
+    ("aadhar", {"Aadhar_No": "1234-5678-9012"}, False),
+    ("aadhar", {"Aadhar_No": "123456789012"}, False),
+    ("aadhar", {"Aadhar_No": "ABCDE1234F"}, True),
+    ("aadhar", {}, True),
+    ("passport", {"Passport_No": "J8369854"}, False),
+    ("passport", {"Passport_No": "jk1234567"}, False),
+    ("passport", {"Passport_No": "1234 5678 9012"}, True),
+    ("pan", {"panCardNumber": "ABCDE1234F"}, False),
+])
+def test_id_number_mismatch_accepts_every_valid_format(doc_type, parsed, mismatch):
+    assert ocr_controller._id_number_mismatch(doc_type, parsed) is mismatch
+
+
+def test_hyphenated_id_number_is_not_reclassified(monkeypatch):
+    extractor = ScriptedExtractor(dict(COMPLETE, Aadhar_No="1234-5678-9012"))
+    events = _run(monkeypatch, extractor, RetryPolicy(max_retries=3, base_delay=0.01), reroute=True)
+    assert [e["event"] for e in events] == ["attempt_started", "result"]
+    assert [fields for _, fields in extractor.calls] == [None]
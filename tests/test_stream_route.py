@@ -0,0 +1,94 @@
+import json
+import asyncio
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from controllers import ocr_controller
+
+FIELDS = {"Name": "Ravi Kumar", "Date_Of_Birth": "01/01/1990", "Gender": "M", "Aadhar_No": "1234 5678 9012"}
+COMPACT_URL = "data:image/jpeg;base64,Y29tcGFjdA=="
+
+
+class StandInExtractor:
+    """Reports fields while "streaming"; the first attempt misses Address, the retry returns it."""
+
+    def __init__(self):
+        self.calls = []
+        self.classified = []
+
+    async def extract(self, image_url, doc_type, fields=None, stream=None, on_partial=None):
+        self.calls.append((image_url, fields))
+        if fields:
+            return {"Address": "12 MG Road, Pune"}
+        if on_partial:
+            on_partial({"Name": FIELDS["Name"]})
+            await asyncio.sleep(0.01)
+        return dict(FIELDS)
+
+    async def classify(self, image_url):
+        self.classified.append(image_url)
+        return "aadhar"
+
+
+def _events(client, **params) -> list:
+    params.setdefault("image_url", f"https://example.com/{uuid.uuid4().hex}.jpg")
+    with client.stream("GET", "/api/v1/ocr/process-document/stream", params=params) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        event = json.loads(data.removeprefix("data: "))
+        assert name == f"event: {event['event']}"
+        events.append(event)
+    return events
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    stand_in = StandInExtractor()
+    monkeypatch.setattr(ocr_controller, "llm_extractor", stand_in)
+    return stand_in
+
+
+def test_events_arrive_in_order(extractor):
+    with TestClient(app) as client:
+        events = _events(client, doc_type="aadhar", max_retries=2)
+    assert [e["event"] for e in events] == ["attempt_started", "partial_fields", "fields", "retry_scheduled",
+                                            "attempt_started", "result"]
+    assert events[1]["fields"] == {"Name": "Ravi Kumar"}
+    assert events[2]["missing_fields"] == ["Address"]
+    assert events[4]["requested_fields"] == ["Address"]
+    assert events[-1]["result"]["parsed_data"]["Address"] == "12 MG Road, Pune"
+
+
+def test_unsupported_type_is_an_error_event(extractor):
+    with TestClient(app) as client:
+        events = _events(client, doc_type="voter_id")
+    assert events == [{"event": "error", "status_code": 400, "detail": "Unsupported document type"}]
+    assert extractor.calls == []
+
+
+def test_image_is_fetched_once_and_compacted_url_is_used(extractor, monkeypatch):
+    fetched = []
+
+    async def fetch(image_url):
+        fetched.append(image_url)
+        return b"image bytes"
+
+    async def compact(image_url, data=None):
+        assert data == b"image bytes"
+        return COMPACT_URL
+
+    monkeypatch.setattr(ocr_controller, "PREPROCESS_IMAGES", True)
+    monkeypatch.setattr(ocr_controller, "fetch_image_bytes", fetch)
+    monkeypatch.setattr(ocr_controller, "compact_image_url", compact)
+    with TestClient(app) as client:
+        events = _events(client, doc_type="auto", max_retries=2)
+    assert events[0] == {"event": "classified", "doc_type": "aadhar"}
+    assert events[-1]["event"] == "result"
+    assert len(fetched) == 1
+    assert extractor.classified == [COMPACT_URL]
+    assert {url for url, _ in extractor.calls} == {COMPACT_URL}
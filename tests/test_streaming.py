@@ -0,0 +1,80 @@
+import json
+import asyncio
+import pytest
+from fakes import FakeProvider, AADHAR_ANSWER, STREAM_TRAILER, STREAM_CHUNK
+from services import ocr_service, provider_client
+from services.backends import Backend, BackendRouter
+from services.rate_limiter import ProviderLimiter
+
+IMAGE_URL = "https://example.com/card.jpg"
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(ocr_service, "stream_stats", ocr_service.StreamStats())
+    monkeypatch.setattr(ocr_service, "token_usage_stats", ocr_service.TokenUsageStats())
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = ProviderLimiter(rpm=0, tpm=0, max_concurrency=1, max_wait=0.5)
+    monkeypatch.setattr(provider_client, "provider_limiter", limiter)
+    return limiter
+
+
+def _with_fake(monkeypatch, test, answer=None, **mode):
+    async def run():
+        async with FakeProvider(answer=answer) as fake:
+            fake.configure("fake", **mode)
+            backend = Backend("fake", "fake-model", base_url=fake.url("fake"), structured_output=False)
+            monkeypatch.setattr(ocr_service, "backend_router", BackendRouter([backend], {}))
+            result = await test(fake)
+            await asyncio.sleep(0.05)  # Let the server notice a closed stream
+            return result, fake
+    return asyncio.run(run())
+
+
+def _extract(**kwargs):
+    return ocr_service.extract_aadhar_details_async(IMAGE_URL, stream=True, **kwargs)
+
+
+def test_stream_is_closed_once_the_json_object_is_complete(monkeypatch, limiter):
+    content, fake = _with_fake(monkeypatch, lambda fake: _extract())
+    assert content.startswith(json.dumps(AADHAR_ANSWER))
+    assert len(content) < len(json.dumps(AADHAR_ANSWER)) + STREAM_CHUNK  # Nothing after the closing chunk
+    assert (fake.streams_cut, fake.streams_completed) == (1, 0)
+    assert ocr_service.stream_stats.early_stops == 1
+    assert ocr_service.token_usage_stats.unreported == 1  # Usage only comes on the last chunk
+
+
+def test_incomplete_answer_is_read_to_the_end_with_usage(monkeypatch, limiter):
+    answer = {key: value for key, value in AADHAR_ANSWER.items() if key != "Address"}
+    content, fake = _with_fake(monkeypatch, lambda fake: _extract(), answer=answer)
+    assert content == json.dumps(answer) + STREAM_TRAILER
+    assert (fake.streams_cut, fake.streams_completed) == (0, 1)
+    assert ocr_service.stream_stats.early_stops == 0
+    (calls, prompt_tokens, _), = ocr_service.token_usage_stats.usage.values()
+    assert (calls, prompt_tokens) == (1, 10)
+
+
+def test_partial_fields_are_reported_while_streaming(monkeypatch, limiter):
+    answer = dict(AADHAR_ANSWER, Name='Ravi "R" Kumar')
+    partials = []
+    _with_fake(monkeypatch, lambda fake: _extract(on_partial=partials.append), answer=answer)
+    assert partials[0] == {"Name": 'Ravi "R" Kumar'}  # Unescaped
+    assert [len(p) for p in partials] == sorted({len(p) for p in partials})
+    assert set(partials[-1]) < set(AADHAR_ANSWER)
+
+
+def test_limiter_slot_is_returned_after_every_stream(monkeypatch, limiter):
+    async def test(fake):
+        await _extract()  # Closed early
+        await _extract(fields=["Name", "Religion"])  # Read to the end
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(_extract(), timeout=0.05)  # Abandoned mid-stream
+        return await _extract()  # Would wait for a free slot, and give up, if one had leaked
+
+    _, fake = _with_fake(monkeypatch, test, chunk_delay=0.02)
+    assert limiter.admitted == 4 and limiter.timed_out == 0
+    assert limiter.budget.in_flight == 0
+    assert fake.streams_cut == 3
@@ -0,0 +1,48 @@
+import json
+import asyncio
+import pytest
+from together import error as together_error
+from fakes import FakeProvider, AADHAR_ANSWER
+from services import ocr_service
+from services.backends import Backend, BackendRouter
+
+IMAGE_URL = "https://example.com/card.jpg"
+
+
+def _extract(monkeypatch, **mode):
+    """One aadhar extraction against a fake backend configured with mode; returns (answer or error, fake, backend)."""
+    async def run():
+        async with FakeProvider() as fake:
+            fake.configure("fake", **mode)
+            backend = Backend("fake", "fake-model", base_url=fake.url("fake"), structured_output=True)
+            monkeypatch.setattr(ocr_service, "backend_router", BackendRouter([backend], {}))
+            try:
+                outcome = await ocr_service.extract_aadhar_details_async(IMAGE_URL, stream=False)
+            except Exception as e:
+                outcome = e
+            return outcome, fake, backend
+    return asyncio.run(run())
+
+
+def test_schema_rejection_falls_back_to_plain_prompts(monkeypatch):
+    content, fake, backend = _extract(monkeypatch, reject_schema=True)
+    assert json.loads(content) == AADHAR_ANSWER
+    assert ["response_format" in body for _, body in fake.requests] == [True, False]
+    assert backend.structured_output is False
+
+
+def test_other_invalid_requests_are_not_retried_without_the_schema(monkeypatch):
+    error, fake, backend = _extract(monkeypatch, status=400, message="image_url could not be downloaded")
+    assert isinstance(error, together_error.InvalidRequestError)
+    assert fake.count("fake") == 1
+    assert backend.structured_output is True
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("response_format json_schema is not supported", True),
+    ("Invalid schema: additionalProperties", True),
+    ("image_url could not be downloaded", False),
+    ("max_tokens must be positive", False),
+])
+def test_rejects_response_format(message, expected):
+    assert ocr_service._rejects_response_format(together_error.InvalidRequestError(message)) is expected
@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from routes import ocr_routes
+
+UPLOAD_URL = "/api/v1/ocr/process-upload"
+
+
+def _raw_post(headers, body=b"", chunks=None):
+    """POST straight to the ASGI app, so the headers are sent exactly as given.
+
+    chunks, if given, is an iterator of body pieces sent one receive() at a time, like a
+    chunked upload; it is left where the app stopped reading.
+    """
+    messages = []
+
+    async def receive():
+        if chunks is None:
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.request", "body": next(chunks, b""), "more_body": True}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": UPLOAD_URL, "raw_path": UPLOAD_URL.encode(), "query_string": b"",
+             "root_path": "", "server": ("testserver", 80), "client": ("testclient", 50000),
+             "headers": [(name.encode(), value.encode()) for name, value in headers.items()]}
+    asyncio.run(app(scope, receive, send))
+    return next(m["status"] for m in messages if m["type"] == "http.response.start")
+
+
+def test_oversized_upload_is_rejected_before_parsing(monkeypatch):
+    monkeypatch.setattr(ocr_routes, "MAX_IMAGE_BYTES", 1024)
+    monkeypatch.setattr(ocr_routes, "MULTIPART_OVERHEAD_BYTES", 1024)
+    response = TestClient(app).post(UPLOAD_URL, files={"file": ("card.jpg", b"\xff" * 4096, "image/jpeg")})
+    assert response.status_code == 413
+    assert "exceeds 1024 bytes" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-5", "12.5", "", "²"])
+def test_malformed_content_length_is_a_bad_request(content_length):
+    headers = {"content-type": "multipart/form-data; boundary=x", "content-length": content_length}
+    assert _raw_post(headers) == 400
+
+
+def test_chunked_upload_is_cut_off_at_the_limit(monkeypatch):
+    monkeypatch.setattr(ocr_routes, "MAX_IMAGE_BYTES", 1024)
+    head = (b'--x\r\nContent-Disposition: form-data; name="file"; filename="card.jpg"\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n')
+    # No Content-Length and a body that never ends: only the stream check can stop it
+    chunks = iter([head] + [b"\xff" * 256] * 1000)
+    status = _raw_post({"content-type": "multipart/form-data; boundary=x"}, chunks=chunks)
+    assert status == 413
+    assert len(list(chunks)) > 990
+
+
+def test_upload_is_read_off_the_stream(monkeypatch):
+    received = {}
+
+    async def controller(data, digest, content_type, doc_type, max_retries):
+        received.update(data=bytes(data), digest=digest, content_type=content_type)
+        return {"ok": True}
+
+    monkeypatch.setattr(ocr_routes, "process_upload_controller", controller)
+    response = TestClient(app).post(UPLOAD_URL, files={"file": ("card.jpg", b"\xff\xd8 image", "image/jpeg")})
+    assert response.status_code == 200
+    assert received == {"data": b"\xff\xd8 image", "digest": hashlib.sha256(b"\xff\xd8 image").hexdigest(),
+                        "content_type": "image/jpeg"}
+
+
+def test_missing_file_field():
+    response = TestClient(app).post(UPLOAD_URL, data={"other": "value"}, files={"x": ("a.txt", b"a")})
+    assert response.status_code == 400
@@ -0,0 +1,53 @@
+import re
+from collections import Counter
+
+
+def _normalize(value) -> str:
+    return re.sub(r'\s+', ' ', str(value)).strip().casefold()
+
+
+class FieldVotes:
+    """Merges parsed results from several attempts field by field.
+
+    Each non-empty value counts as a vote; values are compared after whitespace/case
+    normalization and the first spelling seen is the one returned.
+    """
+
+    def __init__(self):
+        self.votes = {}       # field -> Counter of normalized values
+        self.spellings = {}   # field -> {normalized: original}
+        self.attempts = 0
+
+    def add(self, parsed: dict):
+        self.attempts += 1
+        for field, value in parsed.items():
+            counter = self.votes.setdefault(field, Counter())
+            if value is None or not str(value).strip():
+                continue
+            key = _normalize(value)
+            counter[key] += 1
+            self.spellings.setdefault(field, {}).setdefault(key, str(value).strip())
+
+    def merged(self) -> dict:
+        result = {}
+        for field, counter in self.votes.items():
+            if counter:
+                # most_common keeps insertion order on ties, so the earliest value wins
+                key, _ = counter.most_common(1)[0]
+                result[field] = self.spellings[field][key]
+            else:
+                result[field] = ''
+        return result
+
+    def confidence(self) -> dict:
+        """Share of votes won by the chosen value of each field (0.0 when never found)."""
+        return {
+            field: round(counter.most_common(1)[0][1] / sum(counter.values()), 2) if counter else 0.0
+            for field, counter in self.votes.items()
+        }
+
+    def missing(self, required) -> list:
+        return [field for field in required if not self.votes.get(field)]
+
+    def __bool__(self):
+        return any(self.votes.values())
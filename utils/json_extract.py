@@ -0,0 +1,136 @@
+import re
+import json
+
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_OBJECT_START = re.compile(r'\{\s*["}]')  # A JSON object opens with a key or is empty
+
+
+def _loads_object(candidate: str):
+    """json.loads that only accepts objects, with one lenient retry for trailing commas.
+
+    Objects nested deeper than the interpreter's recursion limit count as unparseable.
+    """
+    if not _OBJECT_START.match(candidate):
+        return None  # Braces in prose ("{x}", templates): not worth a json.loads
+    lenient = _TRAILING_COMMA.sub(r'\1', candidate)
+    for text in (candidate, lenient) if lenient != candidate else (candidate,):
+        try:
+            value = json.loads(text)
+        except (ValueError, RecursionError):
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+class JSONObjectScanner:
+    """Single-pass, brace-balancing scanner for JSON objects embedded in model output.
+
+    Text can be fed in chunks (e.g. from a token stream). Braces inside JSON strings are
+    ignored, code fences and surrounding chatter are skipped naturally, and every character
+    is visited once, so the scan stays linear even on adversarial input such as thousands of
+    unbalanced braces.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.pos = 0
+        self.stack = []       # offsets of currently open braces
+        self.spans = []       # maximal balanced spans seen inside still-open braces
+        self.located = []     # (object, (start, end)) of every object returned so far
+        self._partial = {}    # fields of the object being received, and where their scan stopped
+        self._partial_start = None
+        self._partial_pos = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, chunk: str) -> list:
+        """Consume more text; returns the top-level objects completed by this chunk."""
+        self.text += chunk
+        found = []
+        text = self.text
+        i = self.pos
+        end = len(text)
+        while i < end:
+            if not self.stack:
+                # Outside any object only an opening brace matters: jump straight to the next one
+                i = text.find('{', i)
+                if i < 0:
+                    break
+            ch = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '{':
+                self.stack.append(i)
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '}':
+                start = self.stack.pop()
+                if self.stack:
+                    # Keep only maximal spans so fallback parsing stays linear overall
+                    while self.spans and self.spans[-1][0] > start:
+                        self.spans.pop()
+                    self.spans.append((start, i + 1))
+                else:
+                    self.spans.clear()
+                    obj = _loads_object(text[start:i + 1])
+                    if obj is not None:
+                        found.append(obj)
+                        self.located.append((obj, (start, i + 1)))
+            i += 1
+        self.pos = end
+        return found
+
+    def finish(self) -> list:
+        """Objects that closed inside an unbalanced outer brace (e.g. a stray '{' in prose)."""
+        found = []
+        for start, end in self.spans:
+            obj = _loads_object(self.text[start:end])
+            if obj is not None:
+                found.append(obj)
+                self.located.append((obj, (start, end)))
+        return found
+
+    def partial_fields(self) -> dict:
+        """String fields already complete in the object still being received, unescaped.
+
+        Each call only scans the text after the last complete field, not the whole object again,
+        so calling it after every chunk of a stream does not go quadratic.
+        """
+        if not self.stack:
+            return {}
+        if self._partial_start != self.stack[0]:
+            self._partial, self._partial_start, self._partial_pos = {}, self.stack[0], self.stack[0]
+        for match in _PARTIAL_FIELD.finditer(self.text, self._partial_pos):
+            self._partial[match.group(1)] = _unescape(match.group(2))
+            self._partial_pos = match.end()
+        return dict(self._partial)
+
+
+_PARTIAL_FIELD = re.compile(r'"([^"\\]+)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def _unescape(raw: str) -> str:
+    if '\\' not in raw:
+        return raw
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return raw
+
+
+def locate_json_object(text: str):
+    """Return (object, (start, end)) for the first JSON object found in text, or (None, None)."""
+    scanner = JSONObjectScanner()
+    scanner.feed(text) or scanner.finish()
+    return scanner.located[0] if scanner.located else (None, None)
+
+
+def extract_json_object(text: str):
+    """Return the first JSON object found in text, or None."""
+    return locate_json_object(text)[0]
@@ -1,92 +1,144 @@
 import re
-import json
+from utils.json_extract import locate_json_object
+from models.ocr_model import AadharExtraction, PANExtraction, PassportExtraction, field_meta
 
-def parse_aadhar_details(text: str):
-    # First try to extract valid JSON
-    try:
-        # Match FIRST valid JSON object only
-        json_match = re.search(r'\{[\s\S]*?\}(?=\s*\Z|\s*\{)', text, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group().strip())
-    except:
-        pass
-
-    # If JSON extraction fails, proceed with regex patterns
-    patterns = {
-        'Name': r'(?:Name|NAME)[\s:*]+([A-Za-z\s]+)',
-        'Date_Of_Birth': r'(?:Date\s*Of?\s*Birth|DOB)[\s:*]+(\d{2}/\d{2}/\d{4})',
-        'Gender': r'(?:Gender|GENDER)[\s:*]+(\w+)',
-        'Aadhar_No': r'(?:Aadhar\s*No|Aadhaar\s*Number)[\s:*]+(\d{4}[\s-]?\d{4}[\s-]?\d{4})',
-        'Address': r'(?:Address|ADDRESS)[\s:*]+([^*]+?)(?=\s*\*|$)'
-    }
-
-    details = {}
-    for line in text.split('\n'):
-        line = line.strip()
-        for key, pattern in patterns.items():
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match and not details.get(key):
-                details[key] = match.group(1).strip()
-
-    # Normalization logic remains same
+# Separator between a printed label and its value: a colon, with markdown bullets/bold or quotes around it
+LABEL_SEPARATOR = r'[\s*#"\-]*:[\s:*#"\-]*'
+ANY_VALUE = r'[^\n]+'
+_WORD_CHAR = re.compile(r'\w')
+
+
+def _default_label(name: str) -> str:
+    """Field name split into words ('Place_of_Birth', 'panCardNumber') with any spacing allowed between them"""
+    words = re.findall(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+', name)
+    return r'\s*'.join(words)
+
+
+def field_specs(model) -> dict:
+    """{field: regex with one capture group} for the text fallback, from the model's field metadata."""
+    specs = {}
+    for name, info in model.model_fields.items():
+        meta = field_meta(info)
+        labels = '|'.join(meta.get("labels") or [_default_label(name)])
+        value = meta.get("value_pattern", ANY_VALUE)
+        # Labels must be whole words; the check for a word character before the label is done in
+        # DocumentParser, since a leading \b would cost the regex engine its literal-prefix search
+        specs[name] = rf'(?:{labels})\b{LABEL_SEPARATOR}({value})'
+    return specs
+
+
+class DocumentParser:
+    """Regex field extractor built once from a field-spec table.
+
+    per_line: match each line separately (first match per field wins) instead of the whole text.
+    fill_missing: return every field, with '' for the ones not found.
+    strip_chars: characters removed from matched values before stripping whitespace.
+    """
+
+    def __init__(self, field_specs: dict, flags=0, per_line=False, fill_missing=True, strip_chars=''):
+        self.fields = tuple((key, re.compile(pattern, flags)) for key, pattern in field_specs.items())
+        self.per_line = per_line
+        self.fill_missing = fill_missing
+        self.strip_chars = strip_chars
+
+    @staticmethod
+    def _search(pattern, text: str):
+        """pattern.search, skipping matches whose label starts in the middle of a word ("fatherName")."""
+        match = pattern.search(text)
+        while match and match.start() and _WORD_CHAR.match(text, match.start() - 1):
+            match = pattern.search(text, match.start() + 1)
+        return match
+
+    def _clean(self, value: str) -> str:
+        for char in self.strip_chars:
+            value = value.replace(char, '')
+        return value.strip()
+
+    def parse(self, text: str) -> dict:
+        details = {key: '' for key, _ in self.fields} if self.fill_missing else {}
+        if self.per_line:
+            remaining = list(self.fields)
+            for line in text.split('\n'):
+                line = line.strip()
+                for key, pattern in list(remaining):
+                    match = self._search(pattern, line)
+                    if match:
+                        details[key] = self._clean(match.group(1))
+                        if details[key]:
+                            remaining.remove((key, pattern))
+                if not remaining:
+                    break
+        else:
+            for key, pattern in self.fields:
+                match = self._search(pattern, text)
+                if match:
+                    details[key] = self._clean(match.group(1))
+        return details
+
+
+AADHAR_PARSER = DocumentParser(field_specs(AadharExtraction), re.IGNORECASE, per_line=True, fill_missing=False)
+PAN_PARSER = DocumentParser(field_specs(PANExtraction), re.MULTILINE, strip_chars='*')
+PASSPORT_PARSER = DocumentParser(field_specs(PassportExtraction), re.MULTILINE | re.IGNORECASE)
+
+# Keywords printed on each document (also matched against the classifier's one-word answer),
+# checked in this order as in trial/trial2.py
+DOCUMENT_KEYWORDS = (
+    ('aadhar', re.compile(r'\b(?:UIDAI|AADHAA?R)\b|आधार', re.IGNORECASE)),
+    ('pan', re.compile(r'\b(?:PAN|PERMANENT\s+ACCOUNT\s+NUMBER|INCOME\s+TAX\s+DEPARTMENT)\b', re.IGNORECASE)),
+    ('passport', re.compile(r'\b(?:PASSPORT|REPUBLIC\s+OF\s+INDIA)\b', re.IGNORECASE)),
+)
+
+
+def detect_document_type(text: str):
+    """Document type named by the keywords in text, or None."""
+    for doc_type, pattern in DOCUMENT_KEYWORDS:
+        if pattern.search(text):
+            return doc_type
+    return None
+
+
+def _parse_document(text: str, parser: DocumentParser, model) -> dict:
+    """Validate the JSON answer against the response model in one pass; the label regexes only
+    fill fields the JSON lacks (or everything, when the model answered in prose).
+
+    The regexes never look inside the JSON object itself: an empty "name" would otherwise be
+    filled from the "fatherName" key.
+    """
+    details = {key: '' for key, _ in parser.fields} if parser.fill_missing else {}
+
+    obj, span = locate_json_object(text)
+    if obj:
+        details.update(model.model_validate(obj).model_dump(exclude_unset=True))
+        if all(details.get(key) for key, _ in parser.fields):
+            return details
+        text = text[:span[0]] + '\n' + text[span[1]:]
+
+    for key, value in parser.parse(text).items():
+        if not details.get(key):
+            details[key] = value
     return details
-    
+
+
+def parse_aadhar_details(text: str):
+    return _parse_document(text, AADHAR_PARSER, AadharExtraction)
+
 
 def parse_pan_details(text: str):
-    # Define regex patterns for each field
-    # patterns = {
-    #     'panCardNumber': r'(?:Permanent\s*Account\s*Number|PAN)[:\s\-*]*([A-Z0-9]{10})',
-    #     'name': r'(?:Name\s*on\s*Card|Name)[:\s\-*]*([A-Z\s]+)',
-    #     'fatherName': r'(?:Father\'?s?\s*Name)[:\s\-*]*([A-Z\s]+)',
-    #     'dateOfBirth': r'(?:Date\s*of\s*Birth|DOB)[:\s\-*]*(\d{2}/\d{2}/\d{4})'
-    # }
-    patterns = {
-        'panCardNumber': r'(?:\*|\#|-|\s)*PAN Card Number(?:\*|\#|-|\s)*:(?:\*|\#|-|\s)*(\w{10})',
-        'name': r'(?:\*|\#|-|\s)*Name(?:\*|\#|-|\s)*:(?:\*|\#|-|\s)*([\w\s]+)',
-        'fatherName': r'(?:\*|\#|-|\s)*Father\'s Name(?:\*|\#|-|\s)*:(?:\*|\#|-|\s)*([\w\s]+)',
-        'dateOfBirth': r'(?:\*|\#|-|\s)*Date of Birth(?:\*|\#|-|\s)*:(?:\*|\#|-|\s)*(\d{2}/\d{2}/\d{4})'
-    }
-    
-    details = {
-        'panCardNumber': '',
-        'name': '',
-        'fatherName': '',
-        'dateOfBirth': ''
-    }
-    
-    for key, pattern in patterns.items():
-        match = re.search(pattern, text, re.MULTILINE)
-        if match:
-            # Clean up the extracted value by removing leading asterisks and extra spaces
-            details[key] = match.group(1).replace('*', '').strip()
-    
-    return details
+    return _parse_document(text, PAN_PARSER, PANExtraction)
+
 
 def parse_passport_details(text: str):
-    patterns = {
-        'Passport_No': r'(?:Passport\s*(?:No|Number)[:\s\-*"]*)([A-Z]{1,2}\d{7})',
-        'Surname': r'(?:Surname[:\s\-*"]*)([A-Za-z]+)',
-        'Given_Name': r'(?:Given\s*Name[:\s\-*"]*)([A-Za-z\s]+)',
-        'Nationality': r'(?:Nationality[:\s\-*"]*)([A-Za-z]+)',
-        'Sex': r'(?:Sex[:\s\-*"]*)([MF])',
-        'Date_of_Birth': r'(?:Date\s*of\s*Birth[:\s\-*"]*)(\d{2}/\d{2}/\d{4})',
-        'Place_of_Birth': r'(?:Place\s*of\s*Birth[:\s\-*"]*)([A-Za-z\s]+)',
-        'Date_of_Issue': r'(?:Date\s*of\s*Issue[:\s\-*"]*)(\d{2}/\d{2}/\d{4})',
-        'Date_of_Expiry': r'(?:Date\s*of\s*Expiry[:\s\-*"]*)(\d{2}/\d{2}/\d{4})',
-        'Place_of_Issue': r'(?:Place\s*of\s*Issue[:\s\-*"]*)([A-Za-z\s]+)',
-        'Full_Name': r'(?:Full\s*Name[:\s\-*"]*)([A-Za-z\s]+)'
-    }
-    
-    details = {key: '' for key in patterns}
-    details['Full_Name'] = ''
-    
-    for key, pattern in patterns.items():
-        match = re.search(pattern, text, re.MULTILINE | re.IGNORECASE)
-        if match:
-            details[key] = match.group(1).strip()
-    
+    details = _parse_document(text, PASSPORT_PARSER, PassportExtraction)
+
     # Combine Surname and Given Name
     if details['Surname'] and details['Given_Name']:
         details['Full_Name'] = f"{details['Surname']} {details['Given_Name']}".strip()
-    
-    return details
\ No newline at end of file
+
+    return details
+
+
+DOCUMENT_PARSERS = {
+    'aadhar': parse_aadhar_details,
+    'pan': parse_pan_details,
+    'passport': parse_passport_details,
+}
@@ -0,0 +1,41 @@
+import asyncio
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving while it is running
+    await that same task and get the same result or exception. Waiters are shielded, so a
+    client that disconnects doesn't cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.calls = 0       # do() invocations
+        self.executions = 0  # times the work actually ran
+        self.coalesced = 0   # callers that joined an in-flight execution
+
+    async def do(self, key, make_call):
+        self.calls += 1
+        task = self._tasks.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(make_call())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        self._tasks.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every waiter went away before it finished
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+        }